@@ -0,0 +1,58 @@
+"""Compares the sketch-and-precondition least squares solver with the dense solver.
+
+Run from the root of the repository with
+
+    python benchmarks/least_squares_sketch.py [--repeats 3] [--poly]
+
+For each case the best of a few runs of ``least_squares`` and of ``randomised_least_squares`` (with a count-sketch and a subsampled
+randomised Hadamard transform) is printed, together with the relative difference of the solutions. With ``--poly`` the solvers are
+also compared on a complete fit of a total-order Poly on a Monte Carlo mesh. All the random data are seeded.
+"""
+import argparse
+import time
+import numpy as np
+from equadratures import Parameter, Basis, Poly, evaluate_model
+from equadratures.solver import least_squares, randomised_least_squares
+
+def best_time(function, repeats):
+    times = []
+    for _ in range(0, repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+def compare_solvers(A, b, repeats):
+    t_dense, x_dense = best_time(lambda: least_squares(A, b, False), repeats)
+    print('    least_squares:           %8.3f s' % t_dense)
+    for sketch in ['count-sketch', 'srht']:
+        t_sketch, x_sketch = best_time(lambda: randomised_least_squares(A, b, sketch, random_seed=1), repeats)
+        difference = np.linalg.norm(x_sketch - x_dense) / np.linalg.norm(x_dense)
+        print('    %-24s %8.3f s  (speed-up %.2f, relative difference %.1e)' % (sketch + ':', t_sketch, t_dense / t_sketch, difference))
+def compare_polys(repeats):
+    parameters = [Parameter(distribution='uniform', lower=-1., upper=1., order=7) for _ in range(0, 5)]
+    np.random.seed(0)
+    poly = Poly(parameters, Basis('total-order'), method='least-squares', sampling_args={'mesh': 'monte-carlo'})
+    X = poly.get_points()
+    y = evaluate_model(X, lambda x: np.exp(0.3 * np.sum(x)))
+    print('Total-order Poly, d=5, order 7, monte-carlo mesh (%d x %d):' % (X.shape[0], poly.basis.cardinality))
+    for solver_args in [None, {'sketch': 'count-sketch', 'random-seed': 1}, {'sketch': 'srht', 'random-seed': 1}]:
+        sketched = Poly(parameters, Basis('total-order'), method='least-squares', sampling_args={'sample-points': X}, \
+                solver_args=solver_args)
+        t, _ = best_time(lambda: sketched.set_model(y), repeats)
+        name = 'qr' if solver_args is None else solver_args['sketch']
+        print('    %-24s %8.3f s' % (name + ':', t))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--poly', action='store_true', help='also time complete Poly fits (slower)')
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    for m, n in [(20000, 100), (100000, 300)]:
+        # Columns scaled over four orders of magnitude, so that the system is ill-conditioned and preconditioning matters.
+        A = rng.standard_normal((m, n)) * np.logspace(0, 4, n)
+        b = np.dot(A, rng.standard_normal((n, 1))) + 1e-3 * rng.standard_normal((m, 1))
+        print('Random %d x %d, column scales spanning 1e4:' % (m, n))
+        compare_solvers(A, b, args.repeats)
+    if args.poly:
+        compare_polys(args.repeats)
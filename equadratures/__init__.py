@@ -1,5 +1,9 @@
 from equadratures.parameter import Parameter
 from equadratures.poly import Poly
+from equadratures.frozenpoly import FrozenPoly
+from equadratures.fieldpoly import FieldPoly
+from equadratures.batching import PolyBatcher
+from equadratures.polybank import PolyBank
 from equadratures.stats import Statistics
 from equadratures.basis import Basis
 from equadratures.polynet import Polynet
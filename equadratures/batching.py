@@ -0,0 +1,157 @@
+"""Micro-batching of concurrent single-point evaluations of polynomial surrogates."""
+import asyncio
+from collections import deque
+import time
+import numpy as np
+MAX_BATCH_SIZE = 1024
+MAX_LATENCY = 1e-3
+LATENCY_WINDOW = 10000
+class PolyBatcher(object):
+    """
+    Definition of a batcher: an asyncio front-end that coalesces concurrent single-point evaluations of a polynomial into batched
+    calls to its ``get_polyfit``. A request waits at most ``max_latency`` seconds for others to join its batch, and a batch is
+    dispatched as soon as it holds ``max_batch_size`` points. The per-call overhead of ``get_polyfit`` is thereby shared by every request in
+    a batch. Throughput and latency statistics are gathered as requests are served.
+
+    :param poly: A fitted instance of the Poly class, or any object with a ``get_polyfit`` method (such as a FrozenPoly).
+    :param int max_batch_size: The largest number of points evaluated together.
+    :param float max_latency: The longest time, in seconds, that a request waits for its batch to fill.
+    :param executor: An optional concurrent.futures executor in which batches are evaluated, so that the event loop is not blocked
+        during evaluation; by default batches are evaluated in the event loop. Evaluating a fitted Poly from several threads is safe.
+
+    **Sample constructor initialisations**::
+
+        import asyncio
+        import numpy as np
+        from equadratures import *
+
+        param = Parameter(distribution='uniform', lower=-1., upper=1., order=3)
+        poly = Poly(parameters=[param, param], basis=Basis('total-order'), method='numerical-integration')
+        poly.set_model(lambda x: np.exp(x[0] + x[1]))
+        batcher = PolyBatcher(poly, max_latency=2e-3)
+
+        async def serve(points):
+            return await asyncio.gather(*[batcher.get_polyfit(x) for x in points])
+        values = asyncio.run(serve(np.random.uniform(-1., 1., (100, 2))))
+        print(batcher.get_statistics())
+    """
+    def __init__(self, poly, max_batch_size=MAX_BATCH_SIZE, max_latency=MAX_LATENCY, executor=None):
+        if int(max_batch_size) < 1 or max_latency < 0:
+            raise ValueError('The maximum batch size must be positive and the maximum latency non-negative.')
+        self.poly = poly
+        self.max_batch_size = int(max_batch_size)
+        self.max_latency = float(max_latency)
+        self.executor = executor
+        self._pending = []
+        self._timer = None
+        self._number_of_requests = 0
+        self._number_of_batches = 0
+        self._evaluation_time = 0.0
+        self._first_request = None
+        self._last_response = None
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+    async def get_polyfit(self, point):
+        """
+        Evaluates the polynomial approximation at a single point, as part of a batch.
+
+        :param PolyBatcher self:
+            An instance of the PolyBatcher class.
+        :param numpy.ndarray point:
+            An ndarray with shape (dimensions,).
+        :return:
+            **p**: The polynomial approximation at the point; output as a float, or as a numpy.ndarray of shape (number_of_outputs,)
+            for a fit with multiple outputs.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        submitted = time.perf_counter()
+        if self._first_request is None:
+            self._first_request = submitted
+        self._pending.append((np.asarray(point, dtype=float).reshape(-1), future, submitted))
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_latency, self._dispatch)
+        return await future
+    async def flush(self):
+        """
+        Dispatches the pending requests immediately, without waiting for the latency window to close.
+
+        :param PolyBatcher self:
+            An instance of the PolyBatcher class.
+        """
+        self._dispatch()
+        await asyncio.sleep(0)
+    def _dispatch(self):
+        """
+        Private function that evaluates the pending requests as one batch, in the event loop or in the executor.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        X = np.vstack([point for point, _, _ in batch])
+        if self.executor is None:
+            try:
+                self._resolve(batch, *self._evaluate(X))
+            except Exception as error:
+                self._resolve(batch, error=error)
+        else:
+            evaluation = asyncio.get_running_loop().run_in_executor(self.executor, self._evaluate, X)
+            evaluation.add_done_callback(lambda done: self._resolve(batch, error=done.exception()) if done.exception() \
+                    else self._resolve(batch, *done.result()))
+    def _evaluate(self, X):
+        """
+        Private function that evaluates a batch of points, and returns the values together with the time the evaluation took. It may
+        run in an executor thread, so it leaves the statistics to ``_resolve``.
+        """
+        start = time.perf_counter()
+        values = np.asarray(self.poly.get_polyfit(X)).reshape(X.shape[0], -1)
+        return values, time.perf_counter() - start
+    def _resolve(self, batch, values=None, evaluation_time=0.0, error=None):
+        """
+        Private function that delivers the results of a batch (or its error) to the waiting requests, and records their latencies and
+        the evaluation time. It runs in the event loop thread.
+        """
+        now = time.perf_counter()
+        self._evaluation_time += evaluation_time
+        self._number_of_batches += 1
+        self._number_of_requests += len(batch)
+        self._last_response = now
+        for i, (_, future, submitted) in enumerate(batch):
+            self._latencies.append(now - submitted)
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            elif values.shape[1] == 1:
+                future.set_result(float(values[i, 0]))
+            else:
+                future.set_result(values[i, :])
+    def get_statistics(self):
+        """
+        Returns the throughput and latency statistics of the requests served so far. Latency percentiles are computed over the
+        most recent requests.
+
+        :param PolyBatcher self:
+            An instance of the PolyBatcher class.
+        :return:
+            **statistics**: A dict with the number of ``requests`` and ``batches``, the ``mean_batch_size``, the ``throughput`` in
+            requests per second, the ``mean_latency``, ``median_latency`` and ``p99_latency`` in seconds, and the total
+            ``evaluation_time`` in seconds.
+        """
+        latencies = np.array(self._latencies)
+        if self._number_of_requests > 0 and self._last_response > self._first_request:
+            throughput = self._number_of_requests / (self._last_response - self._first_request)
+        else:
+            throughput = 0.0
+        return {'requests': self._number_of_requests,
+                'batches': self._number_of_batches,
+                'mean_batch_size': self._number_of_requests / max(self._number_of_batches, 1),
+                'throughput': throughput,
+                'mean_latency': float(np.mean(latencies)) if len(latencies) > 0 else 0.0,
+                'median_latency': float(np.percentile(latencies, 50)) if len(latencies) > 0 else 0.0,
+                'p99_latency': float(np.percentile(latencies, 99)) if len(latencies) > 0 else 0.0,
+                'evaluation_time': self._evaluation_time}
@@ -1,6 +1,7 @@
 """ Utilities for dealing with correlated inputs."""
 from equadratures.parameter import Parameter
 from equadratures.poly import Poly, evaluate_model, evaluate_model_gradients
+from equadratures.solver import _scale_rows
 from equadratures.basis import Basis
 import numpy as np
 from scipy import stats
@@ -108,7 +109,7 @@ class Correlations(object):
             S_samples = self.get_correlated_samples(N=N_Psi)
             w_weights = 1.0 / N_Psi * np.ones(N_Psi)
             Psi = poly.get_poly(S_samples).T
-            WPsi = np.diag(np.sqrt(w_weights)) @ Psi
+            WPsi = _scale_rows(np.sqrt(w_weights), Psi)
             self.WPsi = WPsi
 
             R_Psi = np.linalg.qr(WPsi)[1]
@@ -120,9 +121,8 @@ class Correlations(object):
             self.corrected_poly.corr = self
             self.corrected_poly._set_points_and_weights()
 
-            P = self.corrected_poly.get_poly(self.corrected_poly._quadrature_points)
-            W = np.mat(np.diag(np.sqrt(self.corrected_poly._quadrature_weights)))
-            A = W * P.T
+            P = self.corrected_poly._get_poly_cached(self.corrected_poly._quadrature_points)
+            A = _scale_rows(np.sqrt(self.corrected_poly._quadrature_weights), P.T)
             self.corrected_poly.A = A
             self.corrected_poly.P = P
 
@@ -0,0 +1,215 @@
+"""Polynomial surrogates of field outputs via reduced-basis (POD) compression."""
+from equadratures.poly import evaluate_model
+import numpy as np
+FIELD_CHUNK_SIZE = 2**14
+class FieldPoly(object):
+    """
+    Definition of a field polynomial: a surrogate for outputs with many components per sample (for instance a flow field). The snapshot
+    matrix of outputs is compressed by a proper orthogonal decomposition, and polynomial approximations are fitted only to the
+    leading modal coefficients, all against the design matrix of a single Poly. Fields are reconstructed on demand from the modes,
+    and the field mean and variance follow directly from the coefficients of the modal polynomials.
+
+    :param Poly poly: An instance of the Poly class, which sets the parameters, basis, method and sample points.
+    :param int number_of_modes: The number of modes retained. If None, the smallest number of modes that captures a fraction
+        ``energy`` of the variance of the snapshots is retained.
+    :param float energy: The fraction of the variance of the snapshots captured by the retained modes, when ``number_of_modes`` is None.
+    :param string svd: The decomposition of the snapshot matrix. Options are ``randomised``, a randomised range finder with power
+        iterations [1], and ``incremental``, which accumulates the Gram matrix of the snapshots over chunks of the field (so that the
+        snapshots may be a memory-mapped array larger than memory).
+    :param int random_seed: The seed of the randomised decomposition.
+
+    **Sample constructor initialisations**::
+
+        import numpy as np
+        from equadratures import *
+
+        param = Parameter(distribution='uniform', lower=-1., upper=1., order=3)
+        poly = Poly(parameters=[param, param], basis=Basis('total-order'), method='least-squares', sampling_args={'mesh':'monte-carlo'})
+        field = FieldPoly(poly, energy=0.9999)
+        s = np.linspace(0., 1., 10000)
+        field.set_model(lambda x: np.sin(np.pi * s * (1. + x[0])) * np.exp(x[1] * s))
+        mean, variance = field.get_mean_and_variance()
+
+    **References**
+        1. Halko, N., Martinsson, P. G., Tropp, J. A., (2011) Finding Structure with Randomness: Probabilistic Algorithms for Constructing Approximate Matrix Decompositions. SIAM Review, 53(2). `Paper <https://epubs.siam.org/doi/abs/10.1137/090771806>`__
+    """
+    def __init__(self, poly, number_of_modes=None, energy=0.9999, svd='randomised', random_seed=None):
+        if svd not in ['randomised', 'incremental']:
+            raise ValueError('The svd must be one of randomised or incremental.')
+        self.poly = poly
+        self.number_of_modes = number_of_modes
+        self.energy = energy
+        self.svd = svd
+        self.random_seed = random_seed
+        self.field_mean = None
+        self.modes = None
+        self.singular_values = None
+    def set_model(self, snapshots):
+        """
+        Compresses the snapshots and fits the modal coefficients.
+
+        :param FieldPoly self:
+            An instance of the FieldPoly class.
+        :param snapshots:
+            A numpy.ndarray of shape (number_of_samples, field_size), with one row per sample point of the Poly (in the order given by
+            ``poly.get_points()``), or a callable that returns the field at a point.
+        """
+        if callable(snapshots):
+            snapshots = evaluate_model(self.poly.get_points(), snapshots)
+        if snapshots.shape[0] != self.poly.get_points().shape[0]:
+            raise ValueError('The snapshots must have one row per sample point of the poly.')
+        if self.svd == 'incremental':
+            U, s = self._get_gram_decomposition(snapshots)
+        else:
+            U, s = self._get_randomised_decomposition(snapshots)
+        total_energy = self._total_energy
+        if self.number_of_modes is None:
+            captured = np.cumsum(s**2) / total_energy if total_energy > 0 else np.ones(len(s))
+            r = min(int(np.searchsorted(captured, self.energy) + 1), len(s))
+        else:
+            r = min(int(self.number_of_modes), len(s))
+        U, s = U[:, 0:r], s[0:r]
+        # Spatial modes; the modal coefficients of the snapshots are U diag(s).
+        modes = np.zeros((snapshots.shape[1], r))
+        for start in range(0, snapshots.shape[1], FIELD_CHUNK_SIZE):
+            chunk = np.asarray(snapshots[:, start:start+FIELD_CHUNK_SIZE], dtype=float) - self.field_mean[start:start+FIELD_CHUNK_SIZE]
+            modes[start:start+FIELD_CHUNK_SIZE, :] = np.dot(chunk.T, U) / s
+        self.modes = modes
+        self.singular_values = s
+        self.poly.set_model(U * s)
+    def _get_gram_decomposition(self, snapshots):
+        """
+        Private function that returns the left singular vectors and singular values of the centred snapshots, from the eigenvalues of
+        their Gram matrix accumulated over chunks of the field.
+        """
+        N, n = snapshots.shape
+        G = np.zeros((N, N))
+        self.field_mean = np.zeros(n)
+        self._total_energy = 0.0
+        for start in range(0, n, FIELD_CHUNK_SIZE):
+            chunk = np.asarray(snapshots[:, start:start+FIELD_CHUNK_SIZE], dtype=float)
+            self.field_mean[start:start+FIELD_CHUNK_SIZE] = np.mean(chunk, axis=0)
+            chunk = chunk - self.field_mean[start:start+FIELD_CHUNK_SIZE]
+            G += np.dot(chunk, chunk.T)
+            self._total_energy += np.sum(chunk**2)
+        eigenvalues, U = np.linalg.eigh(G)
+        order = np.argsort(eigenvalues)[::-1]
+        s = np.sqrt(np.maximum(eigenvalues[order], 0.0))
+        # Singular values obtained from a Gram matrix are only accurate to about sqrt(eps) relative to the largest.
+        keep = s > np.sqrt(np.finfo(float).eps) * s[0]
+        return U[:, order][:, keep], s[keep]
+    def _get_randomised_decomposition(self, snapshots):
+        """
+        Private function that returns the leading left singular vectors and singular values of the centred snapshots, by a randomised
+        range finder with two power iterations. When the number of modes is set by the energy, the rank of the range finder is doubled
+        until the retained energy is captured.
+        """
+        Y = np.asarray(snapshots, dtype=float)
+        N, n = Y.shape
+        self.field_mean = np.mean(Y, axis=0)
+        Y = Y - self.field_mean
+        self._total_energy = np.sum(Y**2)
+        if self.number_of_modes is None:
+            k = min(N, n, 32)
+        else:
+            k = min(N, n, int(self.number_of_modes) + 10)
+        rng = np.random.default_rng(self.random_seed)
+        while True:
+            Q, _ = np.linalg.qr(np.dot(Y, rng.standard_normal((n, k))))
+            for _ in range(0, 2):
+                Q, _ = np.linalg.qr(np.dot(Y, np.dot(Y.T, Q)))
+            B = np.dot(Q.T, Y)
+            eigenvalues, Ub = np.linalg.eigh(np.dot(B, B.T))
+            order = np.argsort(eigenvalues)[::-1]
+            s = np.sqrt(np.maximum(eigenvalues[order], 0.0))
+            if self.number_of_modes is not None or k == min(N, n) or np.sum(s**2) >= self.energy * self._total_energy:
+                break
+            k = min(N, n, 2 * k)
+        # Singular values obtained from a Gram matrix are only accurate to about sqrt(eps) relative to the largest.
+        keep = s > np.sqrt(np.finfo(float).eps) * s[0]
+        return np.dot(Q, Ub[:, order])[:, keep], s[keep]
+    def get_modes(self):
+        """
+        Returns the retained spatial modes.
+
+        :param FieldPoly self:
+            An instance of the FieldPoly class.
+        :return:
+            **modes**: A numpy.ndarray of orthonormal columns, of shape (field_size, number_of_modes).
+        """
+        return self.modes
+    def get_singular_values(self):
+        """
+        Returns the singular values of the retained modes.
+
+        :param FieldPoly self:
+            An instance of the FieldPoly class.
+        :return:
+            **singular_values**: A numpy.ndarray of shape (number_of_modes,).
+        """
+        return self.singular_values
+    def get_modal_coefficients(self, stack_of_points):
+        """
+        Evaluates the polynomial approximations of the modal coefficients.
+
+        :param FieldPoly self:
+            An instance of the FieldPoly class.
+        :param numpy.ndarray stack_of_points:
+            An ndarray with shape (number_of_observations, dimensions).
+        :return:
+            **modal_coefficients**: A numpy.ndarray of shape (number_of_observations, number_of_modes).
+        """
+        return self.poly.get_polyfit(stack_of_points).reshape(-1, len(self.singular_values))
+    def get_polyfit(self, stack_of_points, field_indices=None):
+        """
+        Reconstructs the field (or part of it) at prescribed points.
+
+        :param FieldPoly self:
+            An instance of the FieldPoly class.
+        :param numpy.ndarray stack_of_points:
+            An ndarray with shape (number_of_observations, dimensions).
+        :param numpy.ndarray field_indices:
+            The indices (or a slice) of the field components to reconstruct; by default the whole field.
+        :return:
+            **field**: A numpy.ndarray of shape (number_of_observations, number_of_field_components).
+        """
+        if field_indices is None:
+            field_indices = slice(None)
+        a = self.get_modal_coefficients(stack_of_points)
+        return self.field_mean[field_indices] + np.dot(a, self.modes[field_indices].T)
+    def get_polyfit_chunks(self, stack_of_points, chunk_size=FIELD_CHUNK_SIZE):
+        """
+        Reconstructs the field at prescribed points in chunks of field components, so that the full field need never be held in memory.
+
+        :param FieldPoly self:
+            An instance of the FieldPoly class.
+        :param numpy.ndarray stack_of_points:
+            An ndarray with shape (number_of_observations, dimensions).
+        :param int chunk_size:
+            The number of field components per chunk.
+        :return:
+            A generator of tuples (field_slice, field), where field is a numpy.ndarray of shape (number_of_observations, chunk_size).
+        """
+        a = self.get_modal_coefficients(stack_of_points)
+        for start in range(0, self.modes.shape[0], chunk_size):
+            field_slice = slice(start, min(start + chunk_size, self.modes.shape[0]))
+            yield field_slice, self.field_mean[field_slice] + np.dot(a, self.modes[field_slice].T)
+    def get_mean_and_variance(self):
+        """
+        Computes the mean and variance of every component of the field, from the coefficients of the modal polynomials.
+
+        :param FieldPoly self:
+            An instance of the FieldPoly class.
+        :return:
+            **mean**: A numpy.ndarray of shape (field_size,) of the approximated mean of the field.
+
+            **variance**: A numpy.ndarray of shape (field_size,) of the approximated variance of the field.
+        """
+        coefficients = np.asarray(self.poly.get_coefficients()).reshape(-1, len(self.singular_values))
+        if hasattr(self.poly, 'inv_R_Psi'):
+            raise ValueError('The field statistics are not available for correlated parameters.')
+        mean = self.field_mean + np.dot(self.modes, coefficients[0,:])
+        # With orthonormal polynomials, the covariance of the modal coefficients is C^T C over the non-constant terms.
+        covariance = np.dot(coefficients[1:,:].T, coefficients[1:,:])
+        variance = np.sum(np.dot(self.modes, covariance) * self.modes, axis=1)
+        return mean, variance
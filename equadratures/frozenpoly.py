@@ -0,0 +1,192 @@
+"""A compact, read-only evaluator for fitted polynomials."""
+import numpy as np
+import threading
+BATCH_SIZE = 1024
+class FrozenPoly(object):
+    """
+    Definition of a frozen polynomial: an immutable snapshot of a fitted Poly that only supports evaluation. The three-term recurrence
+    coefficients of every parameter are tabulated once, terms whose coefficients are (numerically) zero are dropped, and any
+    Gram-Schmidt correction is folded into the coefficients. The univariate polynomials of all dimensions are then generated together
+    by a single vectorised recurrence. Instances are usually obtained through ``Poly.freeze()``. The evaluation methods are reentrant
+    and thread-safe: the only mutable state, the scratch buffers of the batch path, is allocated per thread.
+
+    :param Poly poly: A fitted instance of the Poly class, with a single output.
+    :param float tolerance: Terms whose coefficients have an absolute value less than or equal to this tolerance are dropped.
+    :param int batch_size: The number of points evaluated together by ``get_polyfit``; sets the size of the scratch buffers of each thread.
+
+    **Sample constructor initialisations**::
+
+        import numpy as np
+        from equadratures import *
+
+        param = Parameter(distribution='uniform', lower=-1., upper=1., order=3)
+        poly = Poly(parameters=[param, param], basis=Basis('total-order'), method='numerical-integration')
+        poly.set_model(lambda x: np.exp(x[0] + x[1]))
+        frozen = poly.freeze()
+        y = frozen.get_polyfit_point(np.array([0.1, 0.2]))
+    """
+    def __init__(self, poly, tolerance=0.0, batch_size=BATCH_SIZE):
+        if poly._get_number_of_outputs() > 1:
+            raise ValueError('Only polynomials with a single output can be frozen; freeze a Poly fitted to each output instead.')
+        coefficients = np.asarray(poly.coefficients, dtype=np.float64).reshape(-1)
+        if hasattr(poly, 'inv_R_Psi'):
+            coefficients = np.dot(poly.inv_R_Psi, coefficients)
+        elements = np.asarray(poly.basis.elements).astype(int)
+        active = np.abs(coefficients) > tolerance
+        coefficients = coefficients[active]
+        elements = elements[active, :]
+        dimensions = poly.dimensions
+        if elements.shape[0] > 0:
+            max_orders = np.max(elements, axis=0)
+        else:
+            max_orders = np.zeros(dimensions, dtype=int)
+        highest_order = int(np.max(max_orders))
+
+        # Row u of each table holds the terms of the recurrence for the polynomial of order u:
+        #   p_u = ((x - shift_u) p_{u-1} - previous_scale_u p_{u-2}) * inverse_scale_u
+        # Rows beyond the highest order of a dimension are padded and never read.
+        shift = np.zeros((dimensions, highest_order + 1))
+        previous_scale = np.zeros((dimensions, highest_order + 1))
+        inverse_scale = np.ones((dimensions, highest_order + 1))
+        for k in range(0, dimensions):
+            order = int(max_orders[k])
+            if order == 0:
+                continue
+            ab = poly.parameters[k].get_recurrence_coefficients(order + 1)
+            shift[k, 1:order+1] = ab[0:order, 0]
+            previous_scale[k, 2:order+1] = np.sqrt(ab[1:order, 1])
+            inverse_scale[k, 1:order+1] = 1.0 / np.sqrt(ab[1:order+1, 1])
+        indices = elements + (highest_order + 1) * np.arange(dimensions).reshape(1, -1)
+        for array in (coefficients, elements, indices, shift, previous_scale, inverse_scale):
+            array.setflags(write=False)
+
+        # The single-point path runs the recurrences on Python floats, which is far cheaper than numpy for a handful of values. Its table
+        # concatenates the polynomials of each dimension up to that dimension's highest order; dimensions where every retained term is
+        # of order zero contribute a factor of one and are skipped.
+        point_recurrence = []
+        point_columns = []
+        offset = 0
+        for k in range(0, dimensions):
+            order = int(max_orders[k])
+            point_recurrence.append(tuple(zip(shift[k, 1:order+1].tolist(), previous_scale[k, 1:order+1].tolist(), \
+                    inverse_scale[k, 1:order+1].tolist())))
+            if order > 0:
+                column = np.ascontiguousarray(elements[:, k] + offset)
+                column.setflags(write=False)
+                point_columns.append(column)
+            offset += order + 1
+
+        self._dimensions = dimensions
+        self._highest_order = highest_order
+        self._coefficients = coefficients
+        self._elements = elements
+        self._indices = indices
+        self._shift = shift
+        self._previous_scale = previous_scale
+        self._inverse_scale = inverse_scale
+        self._point_recurrence = tuple(point_recurrence)
+        self._point_columns = tuple(point_columns)
+        self._batch_size = int(batch_size)
+        # Scratch buffers, allocated on first use by each thread.
+        self._scratch = threading.local()
+        self._frozen = True
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError('FrozenPoly instances are immutable.')
+        object.__setattr__(self, name, value)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_scratch')
+        return state
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__['_scratch'] = threading.local()
+    def _get_scratch_buffers(self):
+        """
+        Private function that returns the scratch buffers of the calling thread.
+        """
+        scratch = self._scratch
+        if not hasattr(scratch, 'table'):
+            scratch.table = np.ones((self._dimensions * (self._highest_order + 1), self._batch_size))
+            scratch.product = np.ones((len(self._coefficients), self._batch_size))
+        return scratch.table, scratch.product
+    def get_coefficients(self):
+        """
+        Returns the retained coefficients.
+
+        :param FrozenPoly self:
+            An instance of the FrozenPoly class.
+        :return:
+            **coefficients**: A read-only numpy.ndarray of shape (number_of_active_terms,).
+        """
+        return self._coefficients
+    def get_multi_index(self):
+        """
+        Returns the multi-indices of the retained terms.
+
+        :param FrozenPoly self:
+            An instance of the FrozenPoly class.
+        :return:
+            **multi_indices**: A read-only numpy.ndarray of integers with shape (number_of_active_terms, dimensions).
+        """
+        return self._elements
+    def get_polyfit_point(self, point):
+        """
+        Evaluates the polynomial approximation at a single point. This is the low-latency path.
+
+        :param FrozenPoly self:
+            An instance of the FrozenPoly class.
+        :param numpy.ndarray point:
+            An ndarray with shape (dimensions,).
+        :return:
+            **p**: The polynomial approximation at the point; output as a float.
+        """
+        x = np.asarray(point, dtype=np.float64).reshape(self._dimensions).tolist()
+        table = []
+        for xk, recurrence in zip(x, self._point_recurrence):
+            p0, p1 = 0.0, 1.0
+            table.append(p1)
+            for shift, previous_scale, inverse_scale in recurrence:
+                p0, p1 = p1, ((xk - shift) * p1 - previous_scale * p0) * inverse_scale
+                table.append(p1)
+        if not self._point_columns:
+            return float(np.sum(self._coefficients))
+        table = np.array(table)
+        product = table[self._point_columns[0]]
+        for column in self._point_columns[1:]:
+            product *= table[column]
+        return float(np.dot(self._coefficients, product))
+    def get_polyfit(self, stack_of_points):
+        """
+        Evaluates the polynomial approximation at a set of points, in batches of ``batch_size`` points.
+
+        :param FrozenPoly self:
+            An instance of the FrozenPoly class.
+        :param numpy.ndarray stack_of_points:
+            An ndarray with shape (number_of_observations, dimensions) at which the polynomial fit must be evaluated at.
+        :return:
+            **p**: A numpy.ndarray of shape (number_of_observations, 1) corresponding to the polynomial approximation of the model.
+        """
+        X = np.asarray(stack_of_points, dtype=np.float64).reshape(-1, self._dimensions)
+        no_of_points = X.shape[0]
+        values = np.zeros((no_of_points, 1))
+        rows = self._highest_order + 1
+        shift = self._shift[:, :, np.newaxis]
+        previous_scale = self._previous_scale[:, :, np.newaxis]
+        inverse_scale = self._inverse_scale[:, :, np.newaxis]
+        batch_table, batch_product = self._get_scratch_buffers()
+        for start in range(0, no_of_points, self._batch_size):
+            x = X[start:start+self._batch_size, :].T
+            n = x.shape[1]
+            T = batch_table.reshape(self._dimensions, rows, self._batch_size)[:, :, 0:n]
+            if self._highest_order >= 1:
+                T[:, 1, :] = (x - shift[:, 1]) * inverse_scale[:, 1]
+            for u in range(2, rows):
+                T[:, u, :] = ((x - shift[:, u]) * T[:, u-1, :] - previous_scale[:, u] * T[:, u-2, :]) * inverse_scale[:, u]
+            table = batch_table[:, 0:n]
+            product = batch_product[:, 0:n]
+            product[:] = 1.0
+            for k in range(0, self._dimensions):
+                product *= table[self._indices[:, k], :]
+            values[start:start+n, 0] = np.dot(self._coefficients, product)
+        return values
@@ -72,6 +72,7 @@ class Parameter(object):
         self.upper = upper
         self.endpoints = endpoints
         self.weight_function = weight_function
+        self._linearization_coefficients = None
         self._set_distribution()
         self._set_bounds()
         self._set_moments()
@@ -212,6 +213,34 @@ class Parameter(object):
             Order of the recurrence coefficients.
         """
         return self.distribution.get_recurrence_coefficients(order)
+    def get_linearization_coefficients(self, order):
+        """
+        Computes the linearization coefficients of the orthonormal polynomials, i.e., the expectations E[p_i p_j p_k]. The product
+        p_i p_j is the expansion sum_k E[p_i p_j p_k] p_k, so these coefficients multiply polynomial expansions without quadrature.
+        They are obtained exactly from the recurrence coefficients: p_i(J) e_j, with J the Jacobi matrix, holds the coefficients of
+        p_i p_j. The coefficients are cached, and a request of a lower order is served from the cache.
+
+        :param Parameter self:
+            An instance of the Parameter object.
+        :param int order:
+            The highest order of the polynomials p_i and p_j.
+        :return:
+            **linearization_coefficients**: A numpy.ndarray of shape (order+1, order+1, 2*order+1), whose entry [i,j,k] is E[p_i p_j p_k].
+        """
+        order = int(order)
+        cached = getattr(self, '_linearization_coefficients', None)
+        if cached is None or cached.shape[0] < order + 1:
+            n = 2 * order + 1
+            ab = self.get_recurrence_coefficients(n + 1)
+            J = self.get_jacobi_matrix(n, ab) if n > 1 else np.array([[ab[0, 0]]])
+            cached = np.zeros((order + 1, order + 1, n))
+            previous, current = np.zeros((n, n)), np.eye(n)
+            cached[0] = current[:, 0:order+1].T
+            for i in range(1, order + 1):
+                previous, current = current, (np.dot(J, current) - ab[i-1, 0] * current - np.sqrt(ab[i-1, 1]) * previous) / np.sqrt(ab[i, 1])
+                cached[i] = current[:, 0:order+1].T
+            self._linearization_coefficients = cached
+        return cached[0:order+1, 0:order+1, 0:2*order+1]
     def get_jacobi_eigenvectors(self, order=None):
         """
         Computes the eigenvectors of the Jacobi matrix.
@@ -272,7 +301,7 @@ class Parameter(object):
             JacobiMatrix[order-1, order-1] = ab[order-1,0]
             JacobiMatrix[order-1, order-2] = np.sqrt(ab[order-1,1])
         return JacobiMatrix
-    def _get_orthogonal_polynomial(self, points, order=None):
+    def _get_orthogonal_polynomial(self, points, order=None, dtype=np.float64):
         """
         Private function that evaluates the univariate orthogonal polynomial at quadrature points.
 
@@ -282,6 +311,8 @@ class Parameter(object):
             Points at which the orthogonal polynomial must be evaluated.
         :param int order:
             Order up to which the orthogonal polynomial must be obtained.
+        :param numpy.dtype dtype:
+            The floating point type in which the recurrences are run.
         """
         if order is None:
             order = self.order + 1
@@ -289,6 +320,8 @@ class Parameter(object):
             order = order + 1
         gridPoints = np.asarray(points).copy()
         ab = self.get_recurrence_coefficients(order)
+        if np.dtype(dtype) != np.float64:
+            ab = ab.astype(dtype)
         """
         print('Before:')
         print(gridPoints)
@@ -304,14 +337,12 @@ class Parameter(object):
         print(gridPoints)
         """
 
-        orthopoly = np.zeros((order, len(gridPoints)))  # create a matrix full of zeros
-        derivative_orthopoly = np.zeros((order, len(gridPoints)))
-        dderivative_orthopoly = np.zeros((order, len(gridPoints)))
+        orthopoly = np.zeros((order, len(gridPoints)), dtype=dtype)  # create a matrix full of zeros
+        derivative_orthopoly = np.zeros((order, len(gridPoints)), dtype=dtype)
+        dderivative_orthopoly = np.zeros((order, len(gridPoints)), dtype=dtype)
 
         # Convert the grid points to a numpy array -- simplfy life!
-        gridPointsII = np.zeros((len(gridPoints), 1))
-        for u in range(0, len(gridPoints)):
-            gridPointsII[u, 0] = gridPoints[u]
+        gridPointsII = np.asarray(gridPoints, dtype=dtype).reshape(len(gridPoints), 1)
         orthopoly[0, :] = 1.0
 
         # Cases
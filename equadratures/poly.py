@@ -2,14 +2,37 @@
 from equadratures.stats import Statistics
 from equadratures.parameter import Parameter
 from equadratures.basis import Basis
-from equadratures.solver import Solver
+from equadratures.solver import Solver, least_squares, least_squares_factorisation, factorised_least_squares, qr_append_rows, \
+        qr_append_columns, factorisation_rank, _scale_rows
 from equadratures.subsampling import Subsampling
 from equadratures.quadrature import Quadrature
 from equadratures.datasets import score
+from equadratures.frozenpoly import FrozenPoly, BATCH_SIZE
 import scipy.stats as st
+from scipy.linalg import solve_triangular
+from scipy.sparse import csr_matrix
 import numpy as np
-from copy import deepcopy
+from copy import copy, deepcopy
+from collections import OrderedDict
+from itertools import islice
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import struct
+import zipfile
+import threading
 MAXIMUM_ORDER_FOR_STATS = 8
+MULTIPLE_OUTPUT_METHODS = ['least-squares', 'minimum-norm', 'numerical-integration']
+MAXIMUM_CHUNK_SIZE = 2**22
+EVALUATION_CHUNK_SIZE = 2**20
+VANDERMONDE_CACHE_SIZE = 2**28
+STREAMING_CHUNK_SIZE = 2**16
+TRIE_PLAN_CACHE_SIZE = 8
+SAVE_FORMAT_VERSION = 1
+RELEASED_ATTRIBUTES = ['A', 'P', 'quadrature', '_quadrature_points', '_quadrature_weights', '_model_evaluations', '_gradient_evaluations']
+DETERMINISTIC_MESHES = ['tensor-grid', 'sparse-grid', 'univariate']
+APPENDED_ATTRIBUTES = ['A', 'P', 'inputs', 'outputs', '_quadrature_points', '_quadrature_weights', '_model_evaluations']
 class Poly(object):
     """
     Definition of a polynomial object.
@@ -30,6 +53,7 @@ class Poly(object):
 
             :numpy.ndarray noise-level: The noise level to be used. Can take in both scalar- and vector-valued inputs.
             :bool verbose: The default value is set to ``False``; when set to ``True`` details on the convergence of the solution will be provided. Note for direct methods, this will simply output the condition number of the matrix.
+            :int threads: The number of threads in which the component tensor grids of a ``sparse-grid`` mesh are solved. By default, they are solved one after the other.
 
     **Sample constructor initialisations**::
 
@@ -54,6 +78,13 @@ class Poly(object):
         basis = Basis('sparse-grid', level=7, growth_rule='exponential')
         poly = Poly(parameters=[param, param], basis=basis, method='numerical-integration')
 
+    **Thread safety**
+        Once the model is set, the evaluation methods (``get_polyfit``, ``get_poly``, ``get_polyfit_grad``, ``get_polyfit_hess``,
+        the statistics and their derivatives) only read the fitted state and keep their scratch arrays local to each call; the shared
+        caches are guarded by a lock. A fitted polynomial may therefore be evaluated from many threads at once. ``set_model`` and the
+        other fitting methods modify the polynomial in place and must not run concurrently with evaluations; use ``refit`` instead,
+        which fits a copy. For the lowest latency, ``freeze`` returns an immutable evaluator with per-thread scratch buffers.
+
     **References**
         1. Constantine, P. G., Eldred, M. S., Phipps, E. T., (2012) Sparse Pseudospectral Approximation Method. Computer Methods in Applied Mechanics and Engineering. 1-12. `Paper <https://www.sciencedirect.com/science/article/pii/S0045782512000953>`__
         2. Xiu, D., Karniadakis, G. E., (2002) The Wiener-Askey Polynomial Chaos for Stochastic Differential Equations. SIAM Journal on Scientific Computing,  24(2), `Paper <https://epubs.siam.org/doi/abs/10.1137/S1064827501387826?journalCode=sjoce3>`__
@@ -82,12 +113,11 @@ class Poly(object):
         if not self.basis.orders :
             self.basis.set_orders(self.orders)
         # Initialize some default values!
-        self.inputs = None
-        self.outputs = None
-        self.output_variances = None
-        self.subsampling_algorithm_name = None
-        self.sampling_ratio = 1.0
-        self.statistics_object = None
+        self._set_default_values()
+        if self.solver_args is not None and 'pruning-tolerance' in self.solver_args:
+            self.pruning_tolerance = float(self.solver_args.get('pruning-tolerance'))
+        if self.solver_args is not None and 'threads' in self.solver_args:
+            self.threads = self.solver_args.get('threads')
         self.parameters_order = [ parameter.order for parameter in self.parameters]
         self.highest_order = np.max(self.parameters_order)
         if self.method is not None:
@@ -144,6 +174,94 @@ class Poly(object):
             self._set_points_and_weights()
         else:
             print('WARNING: Method not declared.')
+    def _set_default_values(self):
+        """
+        Private function that initialises the sampling options, the caches and the fitted state to their default values.
+        """
+        self.inputs = None
+        self.outputs = None
+        self.output_variances = None
+        self.subsampling_algorithm_name = None
+        self.sampling_ratio = 1.0
+        self.statistics_object = None
+        self._vandermonde_cache = OrderedDict()
+        self.vandermonde_cache_size = VANDERMONDE_CACHE_SIZE
+        self._trie_plans = OrderedDict()
+        self._cache_lock = threading.RLock()
+        self._polystd_factor = None
+        self._design_factorisation = None
+        self._incremental_factorisation = None
+        self._appended_samples = None
+        self._differentiation_matrices = None
+        self._derivative_polys = {}
+        self.pruning_tolerance = None
+        self._training_data_released = False
+        self.threads = None
+    def __getstate__(self):
+        """
+        Drops the solver and the subsampling algorithm (closures, which cannot be pickled) and the caches when a Poly is pickled or
+        copied.
+        """
+        state = self.__dict__.copy()
+        state.pop('solver', None)
+        state.pop('subsampling_algorithm_function', None)
+        state.pop('_cache_lock', None)
+        state['_vandermonde_cache'] = OrderedDict()
+        state['_design_factorisation'] = None
+        state['_incremental_factorisation'] = None
+        state['_polystd_factor'] = None
+        state['_derivative_polys'] = {}
+        state['_trie_plans'] = OrderedDict()
+        return state
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cache_lock = threading.RLock()
+        if self.method is not None:
+            self._set_solver()
+            self._set_subsampling_algorithm()
+    def __getattr__(self, name):
+        """
+        Recomputes, on first access, the training artefacts dropped by ``release_training_data`` or left stale by ``add_samples``. The
+        design matrices are recomputed from the quadrature points, and the quadrature points of deterministic meshes are regenerated;
+        released model evaluations cannot be. Samples appended by ``add_samples`` are merged into the training data.
+        """
+        if name in APPENDED_ATTRIBUTES and self.__dict__.get('_appended_samples') is not None:
+            with self._cache_lock:
+                self._merge_appended_samples()
+                if name in ['A', 'P'] and name not in self.__dict__:
+                    P = self._get_poly_cached(self._quadrature_points)
+                    self.A = _scale_rows(np.sqrt(self._quadrature_weights), P.T)
+                    self.P = P
+                return self.__dict__[name]
+        if name not in RELEASED_ATTRIBUTES or not self.__dict__.get('_training_data_released', False):
+            raise AttributeError("'Poly' object has no attribute '" + name + "'")
+        with self._cache_lock:
+            if name not in self.__dict__:
+                if name in ['quadrature', '_quadrature_points', '_quadrature_weights'] and self._has_deterministic_mesh():
+                    self.quadrature = Quadrature(parameters=self.parameters, basis=deepcopy(self.basis), points=None, mesh=self.mesh)
+                    self._quadrature_points, self._quadrature_weights = self.quadrature.get_points_and_weights()
+                elif name in ['A', 'P'] and ('_quadrature_points' in self.__dict__ or self._has_deterministic_mesh()):
+                    P = self._get_poly_cached(self._quadrature_points)
+                    self.A = _scale_rows(np.sqrt(self._quadrature_weights), P.T)
+                    self.P = P
+                else:
+                    raise AttributeError('The training data of this polynomial have been released, and ' + name + ' cannot be recomputed.')
+            return self.__dict__[name]
+    def _has_statistics_on_quadrature_points(self):
+        """
+        Private function that returns whether ``_set_statistics`` computes the statistics from the quadrature points of the fit,
+        rather than from a quadrature rule of its own.
+        """
+        if hasattr(self, 'inv_R_Psi') or getattr(self, 'mesh', None) == 'monte-carlo':
+            return False
+        return self.method == 'numerical-integration' or self.dimensions > 6 or self.highest_order > MAXIMUM_ORDER_FOR_STATS
+    def _has_deterministic_mesh(self):
+        """
+        Private function that returns whether the quadrature points are fully determined by the parameters and the basis, so that they
+        can be regenerated after the training data are released.
+        """
+        return getattr(self, 'mesh', None) in DETERMINISTIC_MESHES and self.subsampling_algorithm_name is None and \
+                not hasattr(self, 'corr')
     def _set_parameters(self, parameters):
         """
         Private function that sets the parameters. Required by the Correlated class.
@@ -152,6 +270,9 @@ class Poly(object):
             An instance of the Poly object.
         """
         self.parameters = parameters
+        self.clear_vandermonde_cache()
+        self._design_factorisation = None
+        self._differentiation_matrices = None
         self._set_points_and_weights()
     def get_parameters(self):
         """
@@ -185,7 +306,7 @@ class Poly(object):
                 added = introduction + added_new
             else:
                 added = added + added_new
-        if self.statistics_object is not None:
+        if self.statistics_object is not None and not isinstance(self.statistics_object, list):
             mean_value, var_value = self.get_mean_and_variance()
             X = self.get_points()
             y_eval = self.get_polyfit(X)
@@ -226,6 +347,8 @@ class Poly(object):
         """
         polysolver = Solver(self.method, self.solver_args)
         self.solver = polysolver.get_solver()
+        self._solver_verbose = polysolver.verbose
+        self._solver_sketch = polysolver.sketch
     def _set_points_and_weights(self):
         """
         Private function that sets the quadrature points.
@@ -240,10 +363,12 @@ class Poly(object):
         self.quadrature = Quadrature(parameters=self.parameters, basis=self.basis, \
                         points=self.inputs, mesh=self.mesh, corr=corr)
         quadrature_points, quadrature_weights = self.quadrature.get_points_and_weights()
+        self._polystd_factor = None
+        self._incremental_factorisation = None
+        self._appended_samples = None
         if self.subsampling_algorithm_name is not None:
-            P = self.get_poly(quadrature_points)
-            W = np.mat( np.diag(np.sqrt(quadrature_weights)))
-            A = W * P.T
+            P = self._get_poly_cached(quadrature_points)
+            A = _scale_rows(np.sqrt(quadrature_weights), P.T)
             self.A = A
             self.P = P
             mm, nn = A.shape
@@ -251,12 +376,12 @@ class Poly(object):
             z = self.subsampling_algorithm_function(A, m_refined)
             self._quadrature_points = quadrature_points[z,:]
             self._quadrature_weights = quadrature_weights[z] / np.sum(quadrature_weights[z])
+            self._set_poly_cached(self._quadrature_points, P[:,z])
         else:
             self._quadrature_points = quadrature_points
             self._quadrature_weights = quadrature_weights
-            P = self.get_poly(quadrature_points)
-            W = np.mat( np.diag(np.sqrt(quadrature_weights)))
-            A = W * P.T
+            P = self._get_poly_cached(quadrature_points)
+            A = _scale_rows(np.sqrt(quadrature_weights), P.T)
             self.A = A
             self.P = P
     def get_model_evaluations(self):
@@ -279,30 +404,94 @@ class Poly(object):
 
             **variance**: The approximated variance of the polynomial fit; output as a float.
 
+            For a fit with multiple outputs, both are numpy.ndarrays of shape (number_of_outputs,).
         """
-        self._set_statistics()
-        return self.statistics_object.get_mean(), self.statistics_object.get_variance()
-    def get_skewness_and_kurtosis(self):
+        statistics_object = self._set_statistics()
+        if isinstance(statistics_object, list):
+            return np.array([s.get_mean() for s in statistics_object]), np.array([s.get_variance() for s in statistics_object])
+        return statistics_object.get_mean(), statistics_object.get_variance()
+    def get_skewness_and_kurtosis(self, exact=False):
         """
         Computes the skewness and kurtosis of the model.
 
         :param Poly self:
             An instance of the Poly class.
+        :param bool exact:
+            If true, the third and fourth central moments are computed in coefficient space from the square of the centred polynomial
+            (see ``__mul__``), which is exact and requires no quadrature: E[g^3] = <g^2, g> and E[g^4] = <g^2, g^2>. Not available for
+            correlated parameters.
 
         :return:
             **skewness**: The approximated skewness of the polynomial fit; output as a float.
 
             **kurtosis**: The approximated kurtosis of the polynomial fit; output as a float.
 
+            For a fit with multiple outputs, both are numpy.ndarrays of shape (number_of_outputs,).
         """
-        self._set_statistics()
-        return self.statistics_object.get_skewness(), self.statistics_object.get_kurtosis()
+        if exact:
+            return self._get_exact_skewness_and_kurtosis()
+        statistics_object = self._set_statistics()
+        if isinstance(statistics_object, list):
+            return np.array([s.get_skewness() for s in statistics_object]).reshape(-1), \
+                    np.array([s.get_kurtosis() for s in statistics_object]).reshape(-1)
+        return statistics_object.get_skewness(), statistics_object.get_kurtosis()
+    def _get_exact_skewness_and_kurtosis(self):
+        """
+        Private function that computes the skewness and kurtosis from the coefficients of the square of the centred polynomial.
+        """
+        if hasattr(self, 'inv_R_Psi'):
+            raise ValueError('The exact skewness and kurtosis are not available for correlated parameters.')
+        elements, coefficients = self._get_active_terms()
+        elements = np.asarray(elements).astype(int)
+        centred = np.array(coefficients, dtype=float).reshape(len(coefficients), -1)
+        centred[~np.any(elements, axis=1)] = 0.0
+        # Only the non-zero terms appear in the square; the others do not contribute to the moments.
+        nonzero = np.flatnonzero(np.any(centred != 0.0, axis=1))
+        elements, centred = elements[nonzero], centred[nonzero]
+        square_elements, square = _get_product_coefficients(self.parameters, elements, centred, elements, centred, square=True)
+        lookup = {tuple(index): i for i, index in enumerate(square_elements.tolist())}
+        rows = np.array([lookup[tuple(index)] for index in elements.tolist()])
+        variance = np.sum(centred**2, axis=0)
+        skewness = np.sum(square[rows] * centred, axis=0) / variance**1.5
+        kurtosis = np.sum(square**2, axis=0) / variance**2
+        if len(variance) == 1:
+            return float(skewness[0]), float(kurtosis[0])
+        return skewness, kurtosis
+    def get_covariance(self):
+        """
+        Computes the covariance matrix of the outputs of a fit with multiple outputs; with orthonormal polynomials this follows exactly
+        from the coefficients of the non-constant terms.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :return:
+            **covariance**: A numpy.ndarray of shape (number_of_outputs, number_of_outputs).
+        """
+        coefficients = np.asarray(self.coefficients, dtype=float)
+        coefficients = coefficients.reshape(coefficients.shape[0], -1)
+        if self.pruning_tolerance is not None and not hasattr(self, 'inv_R_Psi'):
+            active = np.zeros(len(coefficients), dtype=bool)
+            active[self._get_active_indices(coefficients)] = True
+            coefficients = coefficients * active.reshape(-1, 1)
+        non_constant = np.any(np.asarray(self.basis.elements) != 0, axis=1)
+        return np.dot(coefficients[non_constant].T, coefficients[non_constant])
+    def _get_statistics(self, statistic):
+        """
+        Private method that applies a Statistics getter to the statistics object, or to that of each output for a fit with multiple outputs.
+        """
+        statistics_object = self._set_statistics()
+        if isinstance(statistics_object, list):
+            return [statistic(s) for s in statistics_object]
+        return statistic(statistics_object)
     def _set_statistics(self):
         """
-        Private method that is used within the statistics routines.
+        Private method that is used within the statistics routines. For a fit with multiple outputs, the statistics object is a list
+        holding one Statistics instance per output; the quadrature rule and the polynomial evaluations are shared. The statistics
+        object is returned, so that callers need not read it back from the (possibly concurrently refitted) instance.
 
         """
-        if self.statistics_object is None:
+        statistics_object = self.statistics_object
+        if statistics_object is None:
             if hasattr(self, 'inv_R_Psi'):
                 # quad_pts, quad_wts = self.quadrature.get_points_and_weights()
                 N_quad = 20000
@@ -322,16 +511,38 @@ class Poly(object):
                 quad_wts = 1.0 / N_quad * np.ones(N_quad)
                 poly_vandermonde_matrix = self.get_poly(quad_pts)
             else:
-                poly_vandermonde_matrix = self.get_poly(self._quadrature_points)
+                poly_vandermonde_matrix = None
                 quad_pts, quad_wts = self.get_points_and_weights()
 
+            if poly_vandermonde_matrix is None:
+                poly_vandermonde_matrix = self._get_poly_cached(self._quadrature_points)
+
             if self.highest_order <= MAXIMUM_ORDER_FOR_STATS and (self.basis.basis_type.lower() == 'total-order'
                 or self.basis.basis_type.lower() == 'hyperbolic-basis'):
-                self.statistics_object = Statistics(self.parameters, self.basis,  self.coefficients,  quad_pts, \
-                        quad_wts, poly_vandermonde_matrix, max_sobol_order=self.highest_order)
+                max_sobol_order = self.highest_order
+            else:
+                max_sobol_order = MAXIMUM_ORDER_FOR_STATS
+            all_coefficients = np.asarray(self.coefficients)
+            all_coefficients = all_coefficients.reshape(all_coefficients.shape[0], -1)
+            statistics_objects = []
+            for j in range(0, all_coefficients.shape[1]):
+                basis, coefficients, polynomial_matrix = self.basis, all_coefficients[:, j:j+1], poly_vandermonde_matrix
+                if self.pruning_tolerance is not None and not hasattr(self, 'inv_R_Psi'):
+                    # Only the active terms contribute to the moments and Sobol' indices.
+                    active = self._get_active_indices(coefficients.reshape(-1))
+                    basis = deepcopy(self.basis)
+                    basis.elements = self.basis.elements[active, :]
+                    basis.cardinality = len(active)
+                    coefficients = coefficients[active]
+                    polynomial_matrix = poly_vandermonde_matrix[active, :]
+                statistics_objects.append(Statistics(self.parameters, basis,  coefficients,  quad_pts, \
+                        quad_wts, polynomial_matrix, max_sobol_order=max_sobol_order))
+            if len(statistics_objects) == 1:
+                statistics_object = statistics_objects[0]
             else:
-                self.statistics_object = Statistics(self.parameters, self.basis,  self.coefficients,  quad_pts, \
-                        quad_wts, poly_vandermonde_matrix, max_sobol_order=MAXIMUM_ORDER_FOR_STATS)
+                statistics_object = statistics_objects
+            self.statistics_object = statistics_object
+        return statistics_object
     def get_sobol_indices(self, order):
         """
         Computes the Sobol' indices.
@@ -342,10 +553,9 @@ class Poly(object):
             The order of the Sobol' indices required.
 
         :return:
-            **sobol_indices**: A dict comprising of Sobol' indices and constitutent mixed orders of the parameters.
+            **sobol_indices**: A dict comprising of Sobol' indices and constitutent mixed orders of the parameters. For a fit with multiple outputs, a list with one entry per output.
         """
-        self._set_statistics()
-        return self.statistics_object.get_sobol(order)
+        return self._get_statistics(lambda s: s.get_sobol(order))
     def get_total_sobol_indices(self):
         """
         Computes the total Sobol' indices.
@@ -354,10 +564,9 @@ class Poly(object):
             An instance of the Poly class.
 
         :return:
-            **total_sobol_indices**: Sobol
+            **total_sobol_indices**: A numpy.ndarray of the total Sobol' indices, one for each parameter. For a fit with multiple outputs, a list with one entry per output.
         """
-        self._set_statistics()
-        return self.statistics_object.get_sobol_total()
+        return self._get_statistics(lambda s: s.get_sobol_total())
     def get_conditional_skewness_indices(self, order):
         """
         Computes the skewness indices.
@@ -368,10 +577,9 @@ class Poly(object):
             The highest order of the skewness indices required.
 
         :return:
-            **skewness_indices**: A dict comprising of skewness indices and constitutent mixed orders of the parameters.
+            **skewness_indices**: A dict comprising of skewness indices and constitutent mixed orders of the parameters. For a fit with multiple outputs, a list with one entry per output.
         """
-        self._set_statistics()
-        return self.statistics_object.get_conditional_skewness(order)
+        return self._get_statistics(lambda s: s.get_conditional_skewness(order))
     def get_conditional_kurtosis_indices(self, order):
         """
         Computes the kurtosis indices.
@@ -382,10 +590,9 @@ class Poly(object):
             The highest order of the kurtosis indices required.
 
         :return:
-            **kurtosis_indices**: A dict comprising of kurtosis indices and constitutent mixed orders of the parameters.
+            **kurtosis_indices**: A dict comprising of kurtosis indices and constitutent mixed orders of the parameters. For a fit with multiple outputs, a list with one entry per output.
         """
-        self._set_statistics()
-        return self.statistics_object.get_conditional_kurtosis(order)
+        return self._get_statistics(lambda s: s.get_conditional_kurtosis(order))
     def set_model(self, model=None, model_grads=None):
         """
         Computes the coefficients of the polynomial via the method selected.
@@ -393,7 +600,9 @@ class Poly(object):
         :param Poly self:
             An instance of the Poly class.
         :param callable model:
-            The function that needs to be approximated. In the absence of a callable function, the input can be the function evaluated at the quadrature points.
+            The function that needs to be approximated. In the absence of a callable function, the input can be the function evaluated at the quadrature points,
+            either as a column vector or as a matrix of shape (number_of_samples, number_of_outputs). Multiple outputs are fitted together against a
+            single design matrix, and the coefficients are then a matrix of shape (number_of_coefficients, number_of_outputs).
         :param callable model_grads:
             The gradient of the function that needs to be approximated. In the absence of a callable gradient function, the input can be a matrix of gradient evaluations at the quadrature points.
         """
@@ -406,8 +615,10 @@ class Poly(object):
                 y = model
                 # TODO: This error gives messages that are usually not clear
                 assert(y.shape[0] == self._quadrature_points.shape[0])
-            if y.shape[1] != 1:
-                raise ValueError( 'model values should be a column vector.')
+            if y.ndim != 2:
+                raise ValueError( 'model values should be a column vector, or a matrix with one column per output.')
+            if y.shape[1] != 1 and self.gradient_flag == 1:
+                raise ValueError( 'gradient-enhanced fits only support a single output.')
             self._model_evaluations = y
             if self.gradient_flag == 1:
                 if (model_grads is None) and (self.gradients is not None):
@@ -417,17 +628,149 @@ class Poly(object):
                         grad_values = evaluate_model_gradients(self._quadrature_points, model_grads, 'matrix')
                     else:
                         grad_values = model_grads
-                p, q = grad_values.shape
-                self._gradient_evaluations = np.zeros((p*q,1))
-                W = np.diag(np.sqrt(self._quadrature_weights))
-                counter = 0
-                for j in range(0,q):
-                    for i in range(0,p):
-                        self._gradient_evaluations[counter] = W[i,i] * grad_values[i,j]
-                        counter = counter + 1
+                # Weighted gradients, stacked one dimension after another.
+                w = np.sqrt(self._quadrature_weights)
+                self._gradient_evaluations = _scale_rows(w, np.asarray(grad_values, dtype=float)).T.reshape(-1, 1)
                 del grad_values
         self.statistics_object = None
         self._set_coefficients()
+    def refit(self, model=None, model_grads=None):
+        """
+        Returns a copy of the polynomial with the model set, leaving this polynomial unchanged (copy-on-write). The copy shares the
+        parameters and the (read-only) sample points and design matrices with this polynomial, but has its own basis, coefficients
+        and caches. A polynomial that is being evaluated from several threads should be refitted this way, and the reference held by
+        the server swapped for the returned polynomial once the fit completes.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param callable model:
+            As in ``set_model``.
+        :param callable model_grads:
+            As in ``set_model``.
+        :return:
+            **poly**: An instance of the Poly class with the model set.
+        """
+        poly = copy(self)
+        poly.basis = deepcopy(self.basis)
+        poly.set_model(model, model_grads)
+        return poly
+    def release_training_data(self, keep_uncertainty=False):
+        """
+        Releases the training data of a fitted polynomial, keeping only what evaluation and statistics need: the parameters, the basis
+        and the coefficients. The design matrices ``A`` and ``P``, the cached polynomial evaluations and factorisations, the model
+        evaluations and the sample outputs and gradients are dropped. The quadrature points and weights are dropped too when the mesh is
+        deterministic (a tensor or sparse grid without subsampling), and are otherwise kept, as the statistics may be computed from them.
+        Discarded quadrature points and design matrices are recomputed on first access; the model evaluations are gone for good, so
+        methods that need them (such as ``get_polyscore`` or ``add_samples``) raise an AttributeError. The model can still be set again
+        with ``set_model``. This is intended for fits that are held in large numbers, for instance in a PolyTree.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param bool keep_uncertainty:
+            If true, the covariance factor of the coefficients is computed before the training data are released, so that
+            ``get_polyfit(..., uq=True)`` remains available.
+        """
+        with self._cache_lock:
+            self._merge_appended_samples()
+            self._appended_samples = None
+            if keep_uncertainty and self._polystd_factor is None:
+                self._polystd_factor = self._get_polystd_factor()
+            for name in RELEASED_ATTRIBUTES:
+                if name in ['_quadrature_points', '_quadrature_weights'] and not self._has_deterministic_mesh():
+                    continue
+                self.__dict__.pop(name, None)
+            self.inputs = None
+            self.outputs = None
+            self.gradients = None
+            self.output_variances = None
+            if self.sampling_args is not None:
+                self.sampling_args = {key: value for key, value in self.sampling_args.items() if not key.startswith('sample-')}
+            self.statistics_object = None
+            self._vandermonde_cache = OrderedDict()
+            self._design_factorisation = None
+            self._incremental_factorisation = None
+            self._training_data_released = True
+    def save(self, filename):
+        """
+        Saves the fitted polynomial to a compact, versioned binary file: an uncompressed .npz archive holding the specifications of the
+        parameters and the basis, the integer multi-indices, the coefficients and any Gram-Schmidt correction. Training data (sample
+        points, outputs and design matrices) and the solver are not saved; the only exception are the quadrature points and weights,
+        which are saved when the statistics are computed from them and they cannot be regenerated from the parameters and the basis
+        (for instance user-defined points in more than six dimensions). Because the archive is uncompressed, ``load`` can
+        memory-map its arrays.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param str filename:
+            The name of the file; the .npz extension is appended if it is missing.
+        """
+        parameters = []
+        for parameter in self.parameters:
+            if parameter.weight_function is not None:
+                raise ValueError('Polynomials over parameters defined by a weight function cannot be saved.')
+            parameters.append({'distribution': parameter.name, 'order': int(parameter.order), 'endpoints': parameter.endpoints, \
+                    'shape_parameter_A': _to_json(parameter.shape_parameter_A), 'shape_parameter_B': _to_json(parameter.shape_parameter_B), \
+                    'variable': parameter.variable, 'lower': _to_json(parameter.lower), 'upper': _to_json(parameter.upper)})
+        solver_args = {}
+        for key, value in (self.solver_args or {}).items():
+            try:
+                solver_args[key] = json.loads(json.dumps(_to_json(value)))
+            except TypeError:
+                pass
+        metadata = {'format': 'equadratures.Poly', 'version': SAVE_FORMAT_VERSION, 'parameters': parameters, \
+                'basis': {'basis_type': self.basis.basis_type, 'orders': [int(order) for order in self.basis.orders], \
+                'level': _to_json(self.basis.level), 'growth_rule': self.basis.growth_rule, 'q': _to_json(self.basis.q)}, \
+                'method': self.method, 'mesh': getattr(self, 'mesh', None), 'gradient_flag': self.gradient_flag, \
+                'pruning_tolerance': self.pruning_tolerance, 'solver_args': solver_args}
+        elements = np.asarray(self.basis.elements)
+        highest = int(np.max(elements)) if elements.size > 0 else 0
+        integer_type = np.int8 if highest <= np.iinfo(np.int8).max else (np.int16 if highest <= np.iinfo(np.int16).max else np.int32)
+        arrays = {'metadata': np.array(json.dumps(metadata)), 'elements': elements.astype(integer_type), \
+                'coefficients': np.asarray(self.coefficients, dtype=np.float64)}
+        if hasattr(self, 'inv_R_Psi'):
+            arrays['inv_R_Psi'] = np.asarray(self.inv_R_Psi, dtype=np.float64)
+        if self._has_statistics_on_quadrature_points() and not self._has_deterministic_mesh():
+            arrays['quadrature_points'] = np.asarray(self._quadrature_points, dtype=np.float64)
+            arrays['quadrature_weights'] = np.asarray(self._quadrature_weights, dtype=np.float64)
+        np.savez(filename, **arrays)
+    @staticmethod
+    def load(filename, mmap_mode='r'):
+        """
+        Loads a polynomial saved by ``save``. The multi-indices, coefficients and any Gram-Schmidt correction are memory-mapped, so
+        that loading is immediate and worker processes that load the same file share its pages. The loaded polynomial supports
+        evaluation, derivatives and statistics, but carries no training data; the quadrature points the statistics need are either
+        saved with it or regenerated.
+
+        :param str filename:
+            The name of the file.
+        :param str mmap_mode:
+            The mode in which the arrays are memory-mapped (see numpy.memmap); None reads them into memory.
+        :return:
+            **poly**: An instance of the Poly class.
+        """
+        with zipfile.ZipFile(filename) as archive:
+            metadata = json.loads(str(np.lib.format.read_array(archive.open('metadata.npy'), allow_pickle=False)))
+            if metadata.get('format') != 'equadratures.Poly' or metadata.get('version', 0) > SAVE_FORMAT_VERSION:
+                raise ValueError('The file is not a saved polynomial, or was saved by a newer version.')
+            arrays = {}
+            for name in archive.namelist():
+                if name != 'metadata.npy':
+                    arrays[name[:-4]] = _load_npz_member(filename, archive, name, mmap_mode)
+        parameters = [Parameter(**specification) for specification in metadata['parameters']]
+        specification = metadata['basis']
+        basis = Basis(specification['basis_type'], level=specification['level'] or None, \
+                growth_rule=specification['growth_rule'] or None, q=specification['q'] if specification['q'] != [] else None)
+        basis.orders = specification['orders']
+        basis.dimensions = len(parameters)
+        basis.elements = arrays['elements']
+        basis.cardinality = len(arrays['elements'])
+        poly = _get_untrained_poly(parameters, basis, arrays['coefficients'], method=metadata['method'], \
+                solver_args=metadata['solver_args'] or None, gradient_flag=metadata['gradient_flag'], mesh=metadata['mesh'], \
+                pruning_tolerance=metadata['pruning_tolerance'], inv_R_Psi=arrays.get('inv_R_Psi'))
+        if 'quadrature_points' in arrays:
+            poly._quadrature_points = arrays['quadrature_points']
+            poly._quadrature_weights = arrays['quadrature_weights']
+        return poly
     def _set_coefficients(self, user_defined_coefficients=None):
         """
         Computes the polynomial approximation coefficients.
@@ -440,6 +783,9 @@ class Poly(object):
         """
         # Check to ensure that if there any NaNs, a different basis must be used and solver must be changed
         # to least squares!
+        self._polystd_factor = None
+        self._incremental_factorisation = None
+        self._derivative_polys = {}
         if user_defined_coefficients is not None:
             self.coefficients = user_defined_coefficients
             return
@@ -459,52 +805,266 @@ class Poly(object):
             self._set_points_and_weights()
             self.set_model()
         if self.mesh == 'sparse-grid':
-            counter = 0
-            multi_index = []
-            coefficients = np.empty([1])
-            multindices = np.empty([1, self.dimensions])
-            for tensor in self.quadrature.list:
-                P = self.get_poly(tensor.points, tensor.basis.elements)
-                W = np.diag(np.sqrt(tensor.weights))
-                A = np.dot(W , P.T)
-                _, _ , counts = np.unique( np.vstack( [tensor.points, self._quadrature_points]), axis=0, return_index=True, return_counts=True)
-                indices = [i for i in range(0, len(counts)) if  counts[i] == 2]
-                b = np.dot(W , self._model_evaluations[indices])
-                del counts, indices
-                coefficients_i = self.solver(A, b)  * self.quadrature.sparse_weights[counter]
-                multindices_i =  tensor.basis.elements
-                coefficients = np.vstack([coefficients_i, coefficients])
-                multindices = np.vstack([multindices_i, multindices])
-                counter = counter +  1
-            multindices = np.delete(multindices, multindices.shape[0]-1, 0)
-            coefficients = np.delete(coefficients, coefficients.shape[0]-1)
-            unique_indices, indices , counts = np.unique(multindices, axis=0, return_index=True, return_counts=True)
-            coefficients_final = np.zeros((unique_indices.shape[0], 1))
-            for i in range(0, unique_indices.shape[0]):
-                for j in range(0, multindices.shape[0]):
-                    if np.array_equiv( unique_indices[i,:] , multindices[j,:]):
-                        coefficients_final[i] = coefficients_final[i] + coefficients[j]
+            # Each tensor grid is solved on its own rows of the sparse grid, and the coefficients of multi-indices that are shared by
+            # several tensor grids are summed.
+            tensors = self.quadrature.list
+            point_indices = self.quadrature.sparse_point_indices
+            model_evaluations = self._model_evaluations
+            def solve_tensor(i):
+                P = self.get_poly(tensors[i].points, tensors[i].basis.elements)
+                w = np.sqrt(tensors[i].weights)
+                A = _scale_rows(w, P.T)
+                b = _scale_rows(w, model_evaluations[point_indices[i]])
+                return np.reshape(self._solve(A, b), (A.shape[1], -1)) * self.quadrature.sparse_weights[i]
+            if self.threads is None:
+                coefficients = [solve_tensor(i) for i in range(0, len(tensors))]
+            else:
+                with ThreadPoolExecutor(max_workers=self.threads) as executor:
+                    coefficients = list(executor.map(solve_tensor, range(0, len(tensors))))
+            multindices = np.vstack([tensor.basis.elements for tensor in tensors])
+            unique_indices, inverse = np.unique(multindices, axis=0, return_inverse=True)
+            coefficients_final = np.zeros((unique_indices.shape[0], model_evaluations.shape[1]))
+            np.add.at(coefficients_final, inverse.reshape(-1), np.vstack(coefficients))
             self.coefficients = coefficients_final
             self.basis.elements = unique_indices
         else:
-            P = self.get_poly(self._quadrature_points)
-            W = np.diag(np.sqrt(self._quadrature_weights))
-            A = np.dot(W , P.T)
-            b = np.dot(W , self._model_evaluations)
+            P = self._get_poly_cached(self._quadrature_points)
+            w = np.sqrt(self._quadrature_weights)
+            A = _scale_rows(w, P.T)
+            b = _scale_rows(w, self._model_evaluations)
             if self.gradient_flag == 1:
-                # Now, we can reduce the number of rows!
-                dP = self.get_poly_grad(self._quadrature_points)
-                C = cell2matrix(dP, W)
-                G = np.vstack([A, C])
-                r =  np.linalg.matrix_rank(G)
-                m, n = A. shape
+                m, n = A.shape
+                d = self._gradient_evaluations
+                matrices = None if hasattr(self, 'inv_R_Psi') else self._get_differentiation_matrices()
+                factorisation = self._get_design_factorisation(A) if matrices is not None and m >= n else None
+                if factorisation is not None and factorisation[0] == 'qr':
+                    # The gradient rows along dimension k are C_k = A D_k, with D_k the sparse differentiation matrix. With A = QR, the
+                    # stacked problem min ||Ax - b||^2 + sum_k ||C_k x - d_k||^2 reduces (up to a constant) to one with rows R and
+                    # R D_k and right-hand sides Q^T b and Q^T d_k. Only the columns of D_k of terms that depend on dimension k are
+                    # nonzero, and the thin QR factorisation R D_k = Q_k R_k over these columns reduces each block further to the rows
+                    # R_k and right-hand side Q_k^T Q^T d_k. C is never formed.
+                    _, Q, R = factorisation
+                    z = np.dot(Q.T, d.reshape(-1, m).T)
+                    rows, h = [R], [np.dot(Q.T, b)]
+                    for k, D in enumerate(matrices):
+                        columns = np.flatnonzero(D.getnnz(axis=0))
+                        if len(columns) == 0:
+                            continue
+                        Q_k, R_k = np.linalg.qr(D[:, columns].T.dot(R.T).T)
+                        block = np.zeros((R_k.shape[0], n))
+                        block[:, columns] = R_k
+                        rows.append(block)
+                        h.append(np.dot(Q_k.T, z[:, k:k+1]))
+                    G, h = np.vstack(rows), np.vstack(h)
+                    C = None
+                else:
+                    C = self._get_gradient_matrix(A, w, matrices)
+                    G, h = np.vstack([A, C]), np.vstack([b, d])
+                # The rank is read off the factorisation of the stacked matrix, which also solves the (overdetermined) system.
+                stacked_factorisation = least_squares_factorisation(G)
+                r = factorisation_rank(stacked_factorisation)
                 print('Gradient computation: The rank of the stacked matrix is '+str(r)+'.')
                 print('The number of unknown basis terms is '+str(n))
                 if n > r:
                     print('WARNING: Please increase the number of samples; one way to do this would be to increase the sampling-ratio.')
-                self.coefficients = self.solver(A, b, C, self._gradient_evaluations)
+                if m >= n:
+                    self.coefficients = factorised_least_squares(stacked_factorisation, h, self._solver_verbose)
+                else:
+                    self.coefficients = self.solver(A, b, C, d)
+            elif self.method == 'least-squares' and self._solver_sketch is None:
+                self.coefficients = factorised_least_squares(self._get_design_factorisation(A), b, self._solver_verbose)
             else:
-                self.coefficients = self.solver(A, b)
+                self.coefficients = self._solve(A, b)
+    def _solve(self, A, b):
+        """
+        Private function that solves for the coefficients with the solver of the polynomial. Solvers that are not linear in b are
+        applied to one output (column of b) at a time.
+        """
+        outputs = b.reshape(b.shape[0], -1)
+        if outputs.shape[1] > 1 and self.method not in MULTIPLE_OUTPUT_METHODS:
+            return np.hstack([np.reshape(self.solver(A, outputs[:, j]), (-1, 1)) for j in range(0, outputs.shape[1])])
+        return self.solver(A, b)
+    def _get_gradient_matrix(self, A, w, matrices=None):
+        """
+        Private function that returns the weighted gradients of the basis at the quadrature points, stacked one dimension after
+        another, from the differentiation matrices when they are available (C_k = A D_k) and otherwise from ``get_poly_grad``.
+        """
+        if matrices is not None:
+            return np.vstack([D.T.dot(A.T).T for D in matrices])
+        return cell2matrix(self.get_poly_grad(self._quadrature_points), w)
+    def set_model_streaming(self, data, chunk_size=STREAMING_CHUNK_SIZE, processes=None, mp_context=None):
+        """
+        Computes the coefficients by least squares from training data that is streamed in chunks, for data sets too large to hold
+        the design matrix in memory. Each chunk is reduced to the triangular factor of its (Christoffel weighted) design matrix,
+        augmented with the outputs, and these factors are combined by tall-skinny QR. Memory is O(cardinality^2 + chunk_size x
+        cardinality), independent of the number of samples, and the coefficients are those of ``least_squares`` on the full
+        data. The training data is not stored on the Poly.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param data:
+            Either a tuple (X, y) of numpy.ndarrays (for example memory-mapped arrays from ``numpy.load(..., mmap_mode='r')``), a
+            tuple of two filenames of .npy files, which are memory-mapped, or an iterable that yields (X, y) chunks. X has shape
+            (number_of_samples, dimensions) and y has shape (number_of_samples, number_of_outputs).
+        :param int chunk_size:
+            The number of rows per chunk when data is a tuple of arrays or filenames.
+        :param int processes:
+            If set, chunks are reduced in parallel by a pool with this many processes. The Poly is pickled to each process.
+        :param mp_context:
+            An optional multiprocessing context, for instance ``multiprocessing.get_context('spawn')``, used to start the pool; by
+            default the pool uses the default start method of the platform.
+        """
+        if isinstance(data, tuple) and len(data) == 2 and not isinstance(data[0], tuple):
+            X, y = data
+            if isinstance(X, str):
+                X = np.load(X, mmap_mode='r')
+            if isinstance(y, str):
+                y = np.load(y, mmap_mode='r')
+            chunks = ((X[i:i+chunk_size], y[i:i+chunk_size]) for i in range(0, len(X), chunk_size))
+        else:
+            chunks = iter(data)
+        R = None
+        if processes is None:
+            for X_chunk, y_chunk in chunks:
+                R = _combine_tsqr_factors(R, [_get_tsqr_factor(self, X_chunk, y_chunk)])
+        else:
+            if mp_context is None:
+                mp_context = multiprocessing.get_context()
+            pool = mp_context.Pool(processes, initializer=_set_streaming_poly, initargs=(self,))
+            try:
+                # Chunks are read in waves, so that no more than a few chunks are held in memory at once.
+                wave = list(islice(chunks, 2 * processes))
+                while wave:
+                    R = _combine_tsqr_factors(R, pool.starmap(_get_streamed_tsqr_factor, wave))
+                    wave = list(islice(chunks, 2 * processes))
+            finally:
+                pool.close()
+                pool.join()
+        if R is None:
+            raise ValueError('No training data was provided.')
+        n = self.basis.cardinality
+        # The augmented factor [[R, Q^T b], [0, *]] holds everything least squares needs; R x = Q^T b has the same (minimum norm)
+        # solution as the full system.
+        R_A = np.zeros((n, n))
+        z = np.zeros((n, R.shape[1] - n))
+        R_A[0:min(n, R.shape[0]), :] = R[0:n, 0:n]
+        z[0:min(n, R.shape[0]), :] = R[0:n, n:]
+        self.coefficients = least_squares(R_A, z, self._solver_verbose if hasattr(self, '_solver_verbose') else False)
+        self.statistics_object = None
+        self._polystd_factor = None
+        self._incremental_factorisation = None
+        self._derivative_polys = {}
+    def add_samples(self, stack_of_points, outputs):
+        """
+        Appends samples to a least squares fit on user-defined points, and updates the coefficients without refitting. The triangular
+        factor of the weighted design matrix is updated with row insertions, so each new sample costs O(cardinality^2). Statistics,
+        scores and uncertainties are recomputed lazily, when next requested, as are the stacked training data and the stored design
+        matrices ``A`` and ``P``.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param numpy.ndarray stack_of_points:
+            An ndarray with shape (number_of_new_samples, dimensions) of the new sample points.
+        :param numpy.ndarray outputs:
+            An ndarray with shape (number_of_new_samples, number_of_outputs) of the model evaluations at the new sample points.
+        """
+        if self.method != 'least-squares' or self.mesh != 'user-defined' or self.subsampling_algorithm_name is not None \
+                or hasattr(self, 'inv_R_Psi'):
+            raise ValueError('Samples can only be added to least-squares fits on user-defined sample-points, without subsampling or correlations.')
+        if not hasattr(self, 'coefficients'):
+            raise ValueError('Please call set_model() before adding samples.')
+        stack_of_points = self._get_stack_of_points(stack_of_points)
+        outputs = np.asarray(outputs, dtype=float).reshape(stack_of_points.shape[0], -1)
+        if self._incremental_factorisation is None:
+            self._incremental_factorisation = self._get_incremental_factorisation()
+        if outputs.shape[1] != self._get_number_of_outputs():
+            raise ValueError('The new outputs must have as many columns as the existing model evaluations.')
+        if self._incremental_factorisation is None:
+            # The existing fit is rank deficient; fall back to a complete refit.
+            self._append_samples(stack_of_points, outputs)
+            self.set_model()
+            return
+        R, z, weight_sum = self._incremental_factorisation
+        # Unnormalised Christoffel weights, as used by the user-defined sampling.
+        P = self._get_poly(stack_of_points, self.basis.elements)
+        weights = 1.0 / np.sum(P**2, 0)
+        A_new = _scale_rows(np.sqrt(weights), P.T)
+        b_new = _scale_rows(np.sqrt(weights), outputs)
+        R, z = qr_append_rows(R, z, A_new, b_new)
+        with self._cache_lock:
+            samples = self._appended_samples
+            if not samples:
+                # The current samples head the list, with their weights unnormalised like those of the new samples.
+                samples = [(self._quadrature_points, self._model_evaluations, self._quadrature_weights * weight_sum)]
+            # The list is replaced rather than extended, as copies of the polynomial (see ``refit``) may share it.
+            self._appended_samples = samples + [(stack_of_points, outputs, weights)]
+            for name in APPENDED_ATTRIBUTES:
+                self.__dict__.pop(name, None)
+        self.statistics_object = None
+        self._polystd_factor = None
+        self._design_factorisation = None
+        self.coefficients = solve_triangular(R, z).reshape(np.shape(self.coefficients))
+        self._incremental_factorisation = (R, z, weight_sum + np.sum(weights))
+        self._derivative_polys = {}
+    def _get_incremental_factorisation(self):
+        """
+        Private function that returns the triangular factor R and the projected outputs Q^T b of the current fit, with the weights
+        left unnormalised (so that appending samples does not rescale earlier rows), together with the sum of those weights. Returns
+        None if the design matrix does not have full column rank.
+        """
+        P = self._get_poly_cached(self._quadrature_points)
+        weight_sum = np.sum(1.0 / np.sum(P**2, 0))
+        w = np.sqrt(self._quadrature_weights)
+        factorisation = self._get_design_factorisation(_scale_rows(w, P.T))
+        if factorisation[0] != 'qr':
+            return None
+        _, Q, R = factorisation
+        z = np.dot(Q.T, _scale_rows(w, self._model_evaluations))
+        return np.sqrt(weight_sum) * R, np.sqrt(weight_sum) * z, weight_sum
+    def _merge_appended_samples(self):
+        """
+        Private function that stacks the samples appended by ``add_samples`` into the training data. The design matrices are left
+        to be recomputed on first access.
+        """
+        samples = self.__dict__.get('_appended_samples')
+        if not samples:
+            return
+        weights = np.hstack([sample[2] for sample in samples])
+        self._appended_samples = []
+        self.inputs = self._quadrature_points = np.vstack([sample[0] for sample in samples])
+        self.outputs = self._model_evaluations = np.vstack([sample[1] for sample in samples])
+        self._quadrature_weights = weights / np.sum(weights)
+    def _append_samples(self, stack_of_points, outputs):
+        """
+        Private function that appends sample points and outputs to the training data, and recomputes the weights and design matrices
+        of all the points.
+        """
+        self.inputs = np.vstack([self._quadrature_points, stack_of_points])
+        self.outputs = np.vstack([self._model_evaluations, outputs])
+        P = self._get_poly_cached(self.inputs)
+        weights = 1.0 / np.sum(P**2, 0)
+        self._quadrature_weights = weights / np.sum(weights)
+        self._quadrature_points = self.inputs
+        self._model_evaluations = self.outputs
+        self.A = _scale_rows(np.sqrt(self._quadrature_weights), P.T)
+        self.P = P
+        self.statistics_object = None
+        self._polystd_factor = None
+        self._design_factorisation = None
+    def _get_design_factorisation(self, A):
+        """
+        Private function that returns a factorisation of the weighted design matrix A, re-using the one from the previous fit when
+        the points, weights, multi-index set and any Gram-Schmidt correction are unchanged. Repeated least squares fits on the same
+        points then cost O(number_of_samples x cardinality) rather than O(number_of_samples x cardinality^2).
+        """
+        fingerprint = hashlib.sha1(self._get_points_fingerprint(self._quadrature_points).encode())
+        fingerprint.update(np.ascontiguousarray(self._quadrature_weights, dtype=np.float64).tobytes())
+        key = fingerprint.hexdigest()
+        cached = self._design_factorisation
+        if cached is None or cached[0] != key:
+            cached = (key, least_squares_factorisation(A))
+            self._design_factorisation = cached
+        return cached[1]
     def get_multi_index(self):
         """
         Returns the multi-index set of the basis.
@@ -558,7 +1118,7 @@ class Poly(object):
             **w**: A numpy.ndarray of the corresponding quadrature weights with shape (number_of_samples, 1).
         """
         return self._quadrature_points, self._quadrature_weights
-    def get_polyfit(self, stack_of_points, uq=False):
+    def get_polyfit(self, stack_of_points, uq=False, dtype=np.float64):
         """
         Evaluates the /polynomial approximation of a function (or model data) at prescribed points.
 
@@ -568,14 +1128,121 @@ class Poly(object):
             An ndarray with shape (number_of_observations, dimensions) at which the polynomial fit must be evaluated at.
         :param bool uq:
             If true, the estimated uncertainty (standard deviation) of the polynomial approximation is also returned.
+        :param numpy.dtype dtype:
+            The floating point type in which the polynomial basis is evaluated, contracted with the coefficients and returned. With
+            ``numpy.float32`` the basis is evaluated in single precision, in chunks of points, and summed over the terms by a single
+            precision matrix product; the relative accuracy is then about 1e-6 (less where the terms cancel), at half the memory
+            traffic. Not available with ``uq``.
         :return:
-            **p**: A numpy.ndarray of shape (1, number_of_observations) corresponding to the polynomial approximation of the model.
+            **p**: A numpy.ndarray of shape (number_of_observations, 1) corresponding to the polynomial approximation of the model; for a
+            fit with multiple outputs the shape is (number_of_observations, number_of_outputs).
         """
-        N = len(self.coefficients)
+        coefficients = self.coefficients
+        N = len(coefficients)
         if uq:
-            return np.dot(self.get_poly(stack_of_points).T , self.coefficients.reshape(N, 1)), self._get_polystd(stack_of_points)
+            if self._get_number_of_outputs() > 1:
+                raise ValueError('The uncertainty of the polynomial approximation is only available for a single output.')
+            if np.dtype(dtype) != np.float64:
+                raise ValueError('The uncertainty of the polynomial approximation is only available in double precision.')
+            return self._get_polystd(stack_of_points, return_polyfit=True)
+        elif np.dtype(dtype) != np.float64:
+            return self._get_polyfit_in_precision(stack_of_points, dtype)
+        elif self.pruning_tolerance is not None:
+            elements, coefficients = self._get_active_terms()
+            return np.dot(self._get_poly(stack_of_points, elements).T, coefficients.reshape(len(coefficients), -1))
+        else:
+            return np.dot(self.get_poly(stack_of_points).T , coefficients.reshape(N, -1))
+    def _get_polyfit_in_precision(self, stack_of_points, dtype):
+        """
+        Private function that evaluates the polynomial approximation in the floating point type dtype, in chunks of points. The
+        coefficients are cast to dtype too, so that no chunk is promoted to double precision for the contraction.
+        """
+        elements, coefficients = self._get_active_terms()
+        coefficients = np.asarray(coefficients, dtype=dtype).reshape(len(elements), -1)
+        stack_of_points = self._get_stack_of_points(stack_of_points)
+        no_of_points = stack_of_points.shape[0]
+        values = np.empty((no_of_points, coefficients.shape[1]), dtype=dtype)
+        chunk = max(1, int(EVALUATION_CHUNK_SIZE // max(len(elements), 1)))
+        for start in range(0, no_of_points, chunk):
+            P = self._get_poly(stack_of_points[start:start+chunk], elements, dtype)
+            values[start:start+chunk] = np.dot(P.T, coefficients)
+        return values
+    def _get_number_of_outputs(self):
+        """
+        Private function that returns the number of outputs fitted by the polynomial.
+        """
+        coefficients = np.asarray(self.coefficients)
+        if coefficients.ndim == 1:
+            return 1
+        return coefficients.shape[1]
+    def set_pruning_tolerance(self, tolerance):
+        """
+        Sets the tolerance below which terms of the polynomial approximation are ignored. Fits from sparse solvers, such as
+        compressed-sensing and relevance-vector-machine, typically leave most coefficients at (or near) zero; with a tolerance set,
+        ``get_polyfit``, its derivatives and the statistics only evaluate the compact set of active terms. The coefficients
+        themselves are left unchanged. The tolerance may also be set via the ``pruning-tolerance`` key of ``solver_args``.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param float tolerance:
+            Terms whose coefficients have an absolute value less than or equal to this tolerance are dropped. A value of None
+            evaluates every term.
+        """
+        if tolerance is None:
+            self.pruning_tolerance = None
         else:
-            return np.dot(self.get_poly(stack_of_points).T , self.coefficients.reshape(N, 1))
+            self.pruning_tolerance = float(tolerance)
+        self.statistics_object = None
+    def get_active_multi_index(self):
+        """
+        Returns the multi-indices of the terms retained under the pruning tolerance.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :return:
+            **multi_indices**: A numpy.ndarray of shape (number_of_active_terms, dimensions).
+        """
+        elements, _ = self._get_active_terms()
+        return elements
+    def _get_active_indices(self, coefficients):
+        """
+        Private function that returns the rows of the multi-index set whose coefficients exceed the pruning tolerance, for any of
+        the outputs. The first term, which carries the mean, is always retained.
+        """
+        active = np.max(np.abs(coefficients).reshape(len(coefficients), -1), axis=1) > self.pruning_tolerance
+        active[0] = True
+        return np.flatnonzero(active)
+    def _get_active_terms(self):
+        """
+        Private function that returns the active multi-indices and their coefficients, with any Gram-Schmidt correction folded
+        into the coefficients so that the terms can be evaluated with ``_get_poly``. The coefficients are returned as a vector for
+        a single output, and as a matrix with one column per output otherwise.
+        """
+        coefficients = np.asarray(self.coefficients)
+        coefficients = coefficients.reshape(coefficients.shape[0], -1)
+        if coefficients.shape[1] == 1:
+            coefficients = coefficients.reshape(-1)
+        if hasattr(self, 'inv_R_Psi'):
+            coefficients = np.dot(self.inv_R_Psi, coefficients)
+        if self.pruning_tolerance is None:
+            return self.basis.elements, coefficients
+        active = self._get_active_indices(coefficients)
+        return self.basis.elements[active, :], coefficients[active]
+    def freeze(self, tolerance=0.0, batch_size=BATCH_SIZE):
+        """
+        Returns an immutable, compact evaluator of the polynomial approximation for low-latency inference. Only fits with a single
+        output can be frozen.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param float tolerance:
+            Terms whose coefficients have an absolute value less than or equal to this tolerance are dropped.
+        :param int batch_size:
+            The number of points evaluated together by the batch path of the evaluator.
+        :return:
+            **frozen_poly**: An instance of the FrozenPoly class.
+        """
+        return FrozenPoly(self, tolerance=tolerance, batch_size=batch_size)
     def get_polyfit_grad(self, stack_of_points, dim_index = None):
         """
         Evaluates the gradient of the polynomial approximation of a function (or model data) at prescribed points.
@@ -588,17 +1255,18 @@ class Poly(object):
         :return:
             **p**: A numpy.ndarray of shape (dimensions, number_of_observations) corresponding to the polynomial gradient approximation of the model.
         """
-        N = len(self.coefficients)
-        if stack_of_points.ndim == 1:
-            no_of_points = 1
+        stack_of_points = self._get_stack_of_points(stack_of_points)
+        if dim_index is None:
+            dim_index = range(self.dimensions)
+        dim_index = list(dim_index)
+        derivative_coefficients = self._get_derivative_coefficients([[k] for k in dim_index])
+        if derivative_coefficients is None:
+            _, grads = self._get_contracted_derivatives(stack_of_points, dim_index=dim_index)
         else:
-            no_of_points, _ = stack_of_points.shape
-        H = self.get_poly_grad(stack_of_points, dim_index=dim_index)
-        grads = np.zeros((self.dimensions, no_of_points ) )
+            grads = np.zeros((self.dimensions, stack_of_points.shape[0]))
+            grads[dim_index, :] = self._get_derivative_values(stack_of_points, derivative_coefficients)
         if self.dimensions == 1:
-            return np.dot(self.coefficients.reshape(N,),  H)
-        for i in range(0, self.dimensions):
-            grads[i,:] = np.dot(self.coefficients.reshape(N,) , H[i] )
+            return grads[0,:]
         return grads
     def get_polyfit_hess(self, stack_of_points):
         """
@@ -612,18 +1280,334 @@ class Poly(object):
         :return:
             **h**: A numpy.ndarray of shape (dimensions, dimensions, number_of_observations) corresponding to the polynomial Hessian approximation of the model.
         """
-        if stack_of_points.ndim == 1:
-            no_of_points = 1
-        else:
-            no_of_points, _ = stack_of_points.shape
-        H = self.get_poly_hess(stack_of_points)
-        if self.dimensions == 1:
-            return np.dot(self.coefficients.T , H)
+        stack_of_points = self._get_stack_of_points(stack_of_points)
+        no_of_points = stack_of_points.shape[0]
         hess = np.zeros((self.dimensions, self.dimensions, no_of_points))
-        for i in range(0, self.dimensions):
+        pairs = [(i, j) for i in range(0, self.dimensions) for j in range(0, i + 1)]
+        derivative_coefficients = self._get_derivative_coefficients([[i, j] for i, j in pairs])
+        if derivative_coefficients is None:
             for j in range(0, self.dimensions):
-                hess[i, j, :] = np.dot(self.coefficients.T , H[i * self.dimensions + j])
+                direction = np.zeros(self.dimensions)
+                direction[j] = 1.0
+                _, _, _, hess[:, j, :] = self._get_contracted_derivatives(stack_of_points, direction=direction, \
+                        hessian_vector_product=True)
+        else:
+            values = self._get_derivative_values(stack_of_points, derivative_coefficients)
+            for (i, j), value in zip(pairs, values):
+                hess[i, j, :] = value
+                hess[j, i, :] = value
+        if self.dimensions == 1:
+            if np.asarray(self.coefficients).ndim == 1:
+                return hess[0, 0, :]
+            return hess[0, :, :]
         return hess
+    def __mul__(self, other):
+        """
+        Multiplies the polynomial approximation by a scalar, or by another polynomial approximation over the same parameters. The
+        product is formed in coefficient space from the linearization coefficients of the orthonormal polynomials, so it is exact and
+        requires no quadrature. The multi-index set of the product is the downward closure of the sums of the multi-indices of the
+        factors, and the orders of the parameters of the product are raised accordingly.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param other:
+            A scalar or an instance of the Poly class. For fits with multiple outputs, the outputs are multiplied element-wise.
+        :return:
+            **product**: An instance of the Poly class.
+        """
+        if np.isscalar(other):
+            return self._get_poly_with_coefficients(self.parameters, deepcopy(self.basis), np.asarray(self.coefficients) * other, \
+                    self.pruning_tolerance)
+        if not isinstance(other, Poly):
+            return NotImplemented
+        self._check_product_compatibility(other)
+        elements_a, a = self._get_active_terms()
+        elements_b, b = other._get_active_terms()
+        elements, coefficients = _get_product_coefficients(self.parameters, elements_a, a.reshape(len(a), -1), \
+                elements_b, b.reshape(len(b), -1), square=other is self)
+        return self._get_poly_with_expansion(elements, coefficients)
+    def __rmul__(self, other):
+        return self.__mul__(other)
+    def __pow__(self, exponent):
+        """
+        Raises the polynomial approximation to a non-negative integer power by repeated squaring in coefficient space; see ``__mul__``.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param int exponent:
+            The power.
+        :return:
+            **power**: An instance of the Poly class.
+        """
+        if int(exponent) != exponent or exponent < 0:
+            raise ValueError('Only non-negative integer powers of a polynomial are supported.')
+        exponent = int(exponent)
+        if exponent == 0:
+            coefficients = np.ones((1, self._get_number_of_outputs()))
+            return self._get_poly_with_expansion(np.zeros((1, self.dimensions), dtype=int), coefficients)
+        power, square = None, self
+        while True:
+            if exponent & 1:
+                power = square if power is None else power * square
+            exponent >>= 1
+            if exponent == 0:
+                return power
+            square = square * square
+    def _check_product_compatibility(self, other):
+        """
+        Private function that checks that two polynomials are expansions in the same orthonormal polynomials, and that neither carries
+        a Gram-Schmidt correction (for which the linearization coefficients of the marginals do not apply).
+        """
+        if hasattr(self, 'inv_R_Psi') or hasattr(other, 'inv_R_Psi'):
+            raise ValueError('Products of polynomials are not available for correlated parameters.')
+        if self.dimensions != other.dimensions:
+            raise ValueError('Polynomials can only be multiplied if they share the same parameters.')
+        for p, q in zip(self.parameters, other.parameters):
+            if p is q:
+                continue
+            order = max(p.order, q.order) + 2
+            if not np.allclose(p.get_recurrence_coefficients(order), q.get_recurrence_coefficients(order)):
+                raise ValueError('Polynomials can only be multiplied if they share the same parameters.')
+    def _get_poly_with_expansion(self, elements, coefficients):
+        """
+        Private function that returns a polynomial with a prescribed multi-index set and coefficients; the orders of the parameters
+        are raised to cover the multi-index set. See ``_get_poly_with_coefficients``.
+        """
+        parameters = deepcopy(self.parameters)
+        orders = np.max(elements, axis=0).astype(int)
+        for k in range(0, self.dimensions):
+            parameters[k].order = max(int(parameters[k].order), int(orders[k]))
+        basis = deepcopy(self.basis)
+        basis.orders = [parameter.order for parameter in parameters]
+        basis.elements = elements
+        basis.cardinality = len(elements)
+        if coefficients.shape[1] == 1 and np.asarray(self.coefficients).ndim == 1:
+            coefficients = coefficients.reshape(-1)
+        return self._get_poly_with_coefficients(parameters, basis, coefficients)
+    def _get_poly_with_coefficients(self, parameters, basis, coefficients, pruning_tolerance=None):
+        """
+        Private function that returns a polynomial over the given parameters and basis with prescribed coefficients. It keeps the
+        method, mesh and any Gram-Schmidt correction of this polynomial, but none of its training data or cached statistics, so
+        it is as compact as a loaded polynomial (see ``load``).
+        """
+        poly = _get_untrained_poly(parameters, basis, coefficients, method=self.method, solver_args=self.solver_args, \
+                gradient_flag=self.gradient_flag, mesh=getattr(self, 'mesh', None), pruning_tolerance=pruning_tolerance, \
+                inv_R_Psi=getattr(self, 'inv_R_Psi', None))
+        if hasattr(self, 'corr'):
+            poly.corr = self.corr
+        poly.vandermonde_cache_size = self.vandermonde_cache_size
+        return poly
+    def get_derivative_poly(self, dim_index):
+        """
+        Returns the partial derivative of the polynomial approximation as a polynomial in its own right. The derivative of an
+        orthogonal polynomial expansion is an expansion in the same polynomials, so the returned Poly shares the parameters and basis
+        of this one and only its coefficients differ. The derivative polynomials are cached until the coefficients change.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param int dim_index:
+            The dimension along which the derivative is taken.
+        :return:
+            **derivative_poly**: An instance of the Poly class.
+        """
+        dim_index = int(dim_index)
+        derivative_polys = self._derivative_polys
+        if dim_index in derivative_polys:
+            return derivative_polys[dim_index]
+        if self._get_number_of_outputs() > 1:
+            raise ValueError('Derivatives of the polynomial approximation are only available for a single output.')
+        matrices = self._get_differentiation_matrices()
+        if matrices is None:
+            raise ValueError('Derivative polynomials require a downward closed multi-index set.')
+        coefficients = np.asarray(self.coefficients, dtype=float)
+        raw_coefficients = coefficients.reshape(-1)
+        if hasattr(self, 'inv_R_Psi'):
+            raw_coefficients = np.dot(self.inv_R_Psi, raw_coefficients)
+        derivative_coefficients = matrices[dim_index].dot(raw_coefficients)
+        if hasattr(self, 'inv_R_Psi'):
+            derivative_coefficients = np.linalg.solve(self.inv_R_Psi, derivative_coefficients)
+        derivative_poly = self._get_poly_with_coefficients(self.parameters, deepcopy(self.basis), \
+                derivative_coefficients.reshape(coefficients.shape), self.pruning_tolerance)
+        derivative_polys[dim_index] = derivative_poly
+        return derivative_poly
+    def _get_differentiation_matrices(self):
+        """
+        Private function that returns, for every dimension, a sparse matrix that maps the coefficients of an expansion in the
+        orthonormal polynomials of the multi-index set to the coefficients of its partial derivative along that dimension. Returns None
+        if the multi-index set is not downward closed, in which case the derivative expansion is not contained in the basis.
+        """
+        elements = np.asarray(self.basis.elements).astype(int)
+        key = hashlib.sha1(np.ascontiguousarray(elements).tobytes()).hexdigest()
+        cached = self._differentiation_matrices
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        cardinality, dimensions = elements.shape
+        lookup = {row.tobytes(): i for i, row in enumerate(elements)}
+        matrices = []
+        for k in range(0, dimensions):
+            D = _get_univariate_differentiation_matrix(self.parameters[k], int(np.max(elements[:,k])))
+            rows, columns, values = [], [], []
+            for j in range(0, D.shape[0] - 1):
+                # Terms of order above j along dimension k contribute to the term lowered to order j.
+                alpha = np.flatnonzero(elements[:,k] > j)
+                beta = elements[alpha, :]
+                beta[:,k] = j
+                indices = np.array([lookup.get(row.tobytes(), -1) for row in beta], dtype=int)
+                if np.any(indices < 0):
+                    matrices = None
+                    break
+                rows.append(indices)
+                columns.append(alpha)
+                values.append(D[elements[alpha,k], j])
+            if matrices is None:
+                break
+            rows, columns, values = np.hstack([[]] + rows), np.hstack([[]] + columns), np.hstack([[]] + values)
+            matrices.append(csr_matrix((values, (rows.astype(int), columns.astype(int))), shape=(cardinality, cardinality)))
+        self._differentiation_matrices = (key, matrices)
+        return matrices
+    def _get_derivative_coefficients(self, derivatives):
+        """
+        Private function that returns the coefficients (in the orthonormal polynomials of the multi-index set, without any
+        Gram-Schmidt correction) of the prescribed partial derivatives, as a matrix with one column per derivative. Each derivative is a
+        list of the dimensions along which it is taken. Returns None if the differentiation matrices are not available.
+        """
+        if self._get_number_of_outputs() > 1:
+            raise ValueError('Derivatives of the polynomial approximation are only available for a single output.')
+        matrices = self._get_differentiation_matrices()
+        if matrices is None:
+            return None
+        coefficients = np.asarray(self.coefficients, dtype=float).reshape(-1)
+        if hasattr(self, 'inv_R_Psi'):
+            coefficients = np.dot(self.inv_R_Psi, coefficients)
+        if self.pruning_tolerance is not None:
+            pruned = np.zeros(len(coefficients))
+            active = self._get_active_indices(coefficients)
+            pruned[active] = coefficients[active]
+            coefficients = pruned
+        derivative_coefficients = np.zeros((len(coefficients), len(derivatives)))
+        for i, derivative in enumerate(derivatives):
+            c = coefficients
+            for k in derivative:
+                c = matrices[k].dot(c)
+            derivative_coefficients[:, i] = c
+        return derivative_coefficients
+    def _get_derivative_values(self, stack_of_points, derivative_coefficients):
+        """
+        Private function that evaluates expansions with the prescribed coefficients (one column per expansion) at a set of points;
+        only the terms that are nonzero in some expansion are evaluated. Returns an ndarray of shape (number_of_expansions,
+        number_of_observations).
+        """
+        active = np.flatnonzero(np.any(derivative_coefficients != 0.0, axis=1))
+        if len(active) == 0:
+            return np.zeros((derivative_coefficients.shape[1], stack_of_points.shape[0]))
+        P = self._get_poly(stack_of_points, self.basis.elements[active, :])
+        return np.dot(derivative_coefficients[active, :].T, P)
+    def get_polyfit_derivatives(self, stack_of_points, direction=None, hessian_vector_product=False):
+        """
+        Evaluates the polynomial approximation together with its gradient in a single pass and, optionally, its Jacobian-vector
+        and Hessian-vector products along a prescribed direction. The coefficients are contracted against the univariate
+        polynomial tables on the fly, so no per-basis derivative arrays are formed.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param numpy.ndarray stack_of_points:
+            An ndarray with shape (number_of_observations, dimensions) at which the derivatives must be evaluated.
+        :param numpy.ndarray direction:
+            An ndarray with shape (dimensions,), or (number_of_observations, dimensions) for a different direction at every point, along
+            which the Jacobian-vector (and Hessian-vector) products are computed.
+        :param bool hessian_vector_product:
+            If true, the Hessian-vector product along ``direction`` is also returned.
+        :return:
+            **p**: A numpy.ndarray of shape (number_of_observations, 1) corresponding to the polynomial approximation of the model.
+
+            **g**: A numpy.ndarray of shape (dimensions, number_of_observations) corresponding to the polynomial gradient approximation of the model.
+
+            **jvp**: A numpy.ndarray of shape (number_of_observations, 1) corresponding to the directional derivative; only returned if ``direction`` is provided.
+
+            **hvp**: A numpy.ndarray of shape (dimensions, number_of_observations) corresponding to the Hessian-vector product; only returned if ``hessian_vector_product`` is true.
+        """
+        if direction is None:
+            if hessian_vector_product:
+                raise ValueError('A direction is required to compute Hessian-vector products.')
+            return self._get_contracted_derivatives(stack_of_points)
+        return self._get_contracted_derivatives(stack_of_points, direction=direction, \
+                hessian_vector_product=hessian_vector_product)
+    def _get_stack_of_points(self, stack_of_points):
+        """
+        Private function that reshapes the input points into an ndarray of shape (number_of_observations, dimensions).
+        """
+        stack_of_points = np.asarray(stack_of_points)
+        if stack_of_points.ndim == 1:
+            if self.dimensions == 1:
+                stack_of_points = stack_of_points.reshape(-1, 1)
+            else:
+                stack_of_points = stack_of_points.reshape(1, -1)
+        return stack_of_points
+    def _get_contracted_derivatives(self, stack_of_points, direction=None, hessian_vector_product=False, dim_index=None):
+        """
+        Private function that evaluates the polynomial approximation, its gradient and, optionally, its directional derivative
+        and Hessian-vector product. Each basis function is treated as a product of univariate dual numbers (value, directional
+        derivative); prefix and suffix products over the dimensions give every leave-one-out product at O(dimensions) cost, and the
+        results are contracted with the coefficients chunk by chunk. Storage is O(dimensions x number_of_observations).
+        """
+        stack_of_points = self._get_stack_of_points(stack_of_points)
+        no_of_points = stack_of_points.shape[0]
+        basis, coefficients = self._get_active_terms()
+        if coefficients.ndim > 1:
+            raise ValueError('Derivatives of the polynomial approximation are only available for a single output.')
+        basis_entries, dimensions = basis.shape
+        if dim_index is None:
+            dim_index = range(dimensions)
+        tangent = direction is not None
+        if tangent:
+            direction = np.asarray(direction, dtype=float)
+            if direction.ndim == 1:
+                direction = direction.reshape(dimensions, 1)
+            else:
+                direction = direction.T
+        p, dp, d2p = {}, {}, {}
+        for k in range(0, dimensions):
+            p[k], dp[k], d2p[k] = self.parameters[k]._get_orthogonal_polynomial(stack_of_points[:,k], int(np.max(basis[:,k])))
+
+        values = np.zeros(no_of_points)
+        grads = np.zeros((dimensions, no_of_points))
+        jvp = np.zeros(no_of_points)
+        hvp = np.zeros((dimensions, no_of_points))
+        chunk = max(1, int(MAXIMUM_CHUNK_SIZE // (no_of_points * (dimensions + 1) * (2 if tangent else 1))))
+        for start in range(0, basis_entries, chunk):
+            alpha = basis[start:start+chunk, :].astype(int)
+            c = coefficients[start:start+chunk]
+            # Forward sweep: prefix products of the univariate factors.
+            prefix_value = [np.ones((alpha.shape[0], no_of_points))]
+            prefix_tangent = [np.zeros((alpha.shape[0], no_of_points))]
+            for k in range(0, dimensions):
+                factor = p[k][alpha[:,k]]
+                prefix_value.append(prefix_value[k] * factor)
+                if tangent:
+                    prefix_tangent.append(prefix_value[k] * direction[k] * dp[k][alpha[:,k]] + prefix_tangent[k] * factor)
+            values += np.dot(c, prefix_value[dimensions])
+            if tangent:
+                jvp += np.dot(c, prefix_tangent[dimensions])
+            # Backward sweep: suffix products give the product over all dimensions bar one.
+            suffix_value = np.ones((alpha.shape[0], no_of_points))
+            suffix_tangent = np.zeros((alpha.shape[0], no_of_points))
+            for k in range(dimensions - 1, -1, -1):
+                factor = p[k][alpha[:,k]]
+                dfactor = dp[k][alpha[:,k]]
+                excluded_value = prefix_value[k] * suffix_value
+                if k in dim_index:
+                    grads[k,:] += np.dot(c, dfactor * excluded_value)
+                if tangent:
+                    if hessian_vector_product:
+                        excluded_tangent = prefix_value[k] * suffix_tangent + prefix_tangent[k] * suffix_value
+                        hvp[k,:] += np.dot(c, direction[k] * d2p[k][alpha[:,k]] * excluded_value + dfactor * excluded_tangent)
+                    suffix_tangent = suffix_tangent * factor + suffix_value * direction[k] * dfactor
+                suffix_value = suffix_value * factor
+        if not tangent:
+            return values.reshape(-1, 1), grads
+        if hessian_vector_product:
+            return values.reshape(-1, 1), grads, jvp.reshape(-1, 1), hvp
+        return values.reshape(-1, 1), grads, jvp.reshape(-1, 1)
     def get_polyfit_function(self):
         """
         Returns a callable polynomial approximation of a function (or model data).
@@ -633,8 +1617,7 @@ class Poly(object):
         :return:
             A callable function.
         """
-        N = len(self.coefficients)
-        return lambda x: np.dot( self.get_poly(x).T ,  self.coefficients.reshape(N, 1) )
+        return lambda x: self.get_polyfit(x)
     def get_polyfit_grad_function(self):
         """
         Returns a callable for the gradients of the polynomial approximation of a function (or model data).
@@ -655,7 +1638,7 @@ class Poly(object):
             A callable function.
         """
         return lambda x : self.get_polyfit_hess(x)
-    def get_poly(self, stack_of_points, custom_multi_index=None):
+    def get_poly(self, stack_of_points, custom_multi_index=None, dtype=np.float64):
         """
         Evaluates the value of each polynomial basis function at a set of points.
 
@@ -663,6 +1646,8 @@ class Poly(object):
             An instance of the Poly class.
         :param numpy.ndarray stack_of_points:
             An ndarray with shape (number of observations, dimensions) at which the polynomial must be evaluated.
+        :param numpy.dtype dtype:
+            The floating point type in which the polynomials are evaluated; ``numpy.float32`` halves the memory of the result.
 
         :return:
             **polynomial**: A numpy.ndarray of shape (cardinality, number_of_observations) corresponding to the polynomial basis function evaluations
@@ -672,6 +1657,17 @@ class Poly(object):
             basis = self.basis.elements
         else:
             basis = custom_multi_index
+        polynomial = self._get_poly(stack_of_points, basis, dtype)
+        if hasattr(self, 'inv_R_Psi'):
+            polynomial = np.asarray(self.inv_R_Psi, dtype=dtype).T @ polynomial
+        return polynomial
+    def _get_poly(self, stack_of_points, basis, dtype=np.float64):
+        """
+        Private function that evaluates the orthonormal polynomials of a multi-index set at a set of points, without any
+        Gram-Schmidt correction. The multivariate polynomials are built along a prefix tree of the multi-indices (see
+        ``_get_trie_plan``), so that partial products shared by several multi-indices are formed once and factors of order zero
+        are skipped.
+        """
         basis_entries, dimensions = basis.shape
 
         if stack_of_points.ndim == 1:
@@ -682,22 +1678,103 @@ class Poly(object):
 
         # Save time by returning if univariate!
         if dimensions == 1:
-            poly , _ , _ =  self.parameters[0]._get_orthogonal_polynomial(stack_of_points, int(np.max(basis)))
+            poly , _ , _ =  self.parameters[0]._get_orthogonal_polynomial(stack_of_points, int(np.max(basis)), dtype)
+            if poly.shape[0] != basis_entries:
+                poly = poly[basis[:,0].astype(int)]
             return poly
         else:
             for i in range(0, dimensions):
                 if len(stack_of_points.shape) == 1:
                     stack_of_points = np.array([stack_of_points])
-                p[i] , _ , _ = self.parameters[i]._get_orthogonal_polynomial(stack_of_points[:,i], int(np.max(basis[:,i])) )
+                p[i] , _ , _ = self.parameters[i]._get_orthogonal_polynomial(stack_of_points[:,i], int(np.max(basis[:,i])), dtype)
+
+        # Walk down the prefix tree, one dimension at a time.
+        number_of_rows, steps, leaf_rows = self._get_trie_plan(basis)
+        partial_products = np.empty((number_of_rows, no_of_points), dtype=dtype)
+        partial_products[0, :] = 1.0
+        for k, start, parent_rows, orders in steps:
+            partial_products[start:start+len(orders)] = partial_products[parent_rows] * p[k][orders]
+        return partial_products[leaf_rows]
+    def _get_trie_plan(self, basis):
+        """
+        Private function that returns the evaluation plan of the prefix tree of a multi-index set; plans are cached for the most
+        recently used multi-index sets.
+        """
+        key = id(basis)
+        with self._cache_lock:
+            cached = self._trie_plans.get(key)
+            if cached is not None and cached[0].shape == basis.shape and np.array_equal(cached[0], basis):
+                self._trie_plans.move_to_end(key)
+                return cached[1]
+        plan = _get_trie_plan(basis)
+        with self._cache_lock:
+            self._trie_plans[key] = (basis.copy(), plan)
+            while len(self._trie_plans) > TRIE_PLAN_CACHE_SIZE:
+                self._trie_plans.popitem(last=False)
+        return plan
+    def clear_vandermonde_cache(self):
+        """
+        Empties the cache of polynomial basis evaluations. The cache is keyed on the points, the multi-index set and any Gram-Schmidt
+        correction, so it only needs to be cleared explicitly if the parameters are modified in place.
 
-        # One loop for polynomials
-        polynomial = np.ones((basis_entries, no_of_points))
-        for k in range(dimensions):
-            basis_entries_this_dim = basis[:, k].astype(int)
-            polynomial *= p[k][basis_entries_this_dim]
+        :param Poly self:
+            An instance of the Poly class.
+        """
+        self._vandermonde_cache = OrderedDict()
+    def set_vandermonde_cache_size(self, cache_size):
+        """
+        Sets the memory budget of the cache of polynomial basis evaluations; the least recently used entries are evicted first.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param int cache_size:
+            The maximum number of bytes held by the cache. A value of zero disables caching.
+        """
+        self.vandermonde_cache_size = int(cache_size)
+        self._shrink_vandermonde_cache()
+    def _get_points_fingerprint(self, stack_of_points):
+        """
+        Private function that returns a hash of a set of points together with the multi-index set (and Gram-Schmidt correction) used to evaluate them.
+        """
+        points = np.ascontiguousarray(stack_of_points, dtype=np.float64)
+        fingerprint = hashlib.sha1(str(points.shape).encode())
+        fingerprint.update(points.tobytes())
+        fingerprint.update(np.ascontiguousarray(self.basis.elements, dtype=np.float64).tobytes())
         if hasattr(self, 'inv_R_Psi'):
-            polynomial = self.inv_R_Psi.T @ polynomial
-        return polynomial
+            fingerprint.update(np.ascontiguousarray(self.inv_R_Psi, dtype=np.float64).tobytes())
+        return fingerprint.hexdigest()
+    def _shrink_vandermonde_cache(self):
+        """
+        Private function that evicts the least recently used cache entries until the cache fits within its memory budget.
+        """
+        cache_size = sum(P.nbytes for P in self._vandermonde_cache.values())
+        while self._vandermonde_cache and cache_size > self.vandermonde_cache_size:
+            _, P = self._vandermonde_cache.popitem(last=False)
+            cache_size -= P.nbytes
+    def _set_poly_cached(self, stack_of_points, P):
+        """
+        Private function that stores the polynomial basis evaluations at a set of points in the cache.
+        """
+        if P.nbytes > self.vandermonde_cache_size:
+            return
+        key = self._get_points_fingerprint(stack_of_points)
+        with self._cache_lock:
+            self._vandermonde_cache[key] = P
+            self._shrink_vandermonde_cache()
+    def _get_poly_cached(self, stack_of_points):
+        """
+        Private function that returns the output of ``get_poly`` at a set of points, re-using earlier evaluations at the same points.
+        The returned array is shared with the cache and should not be modified in place.
+        """
+        key = self._get_points_fingerprint(stack_of_points)
+        with self._cache_lock:
+            P = self._vandermonde_cache.get(key)
+            if P is not None:
+                self._vandermonde_cache.move_to_end(key)
+                return P
+        P = self.get_poly(stack_of_points)
+        self._set_poly_cached(stack_of_points, P)
+        return P
     def get_poly_grad(self, stack_of_points, dim_index = None):
         """
         Evaluates the gradient for each of the polynomial basis functions at a set of points,
@@ -833,7 +1910,7 @@ class Poly(object):
         """
 
         X = self.get_points()
-        y_pred = self.get_polyfit(X)
+        y_pred = np.dot(self._get_poly_cached(X).T, np.asarray(self.coefficients).reshape(len(self.coefficients), -1))
         train_score = score(self.outputs,y_pred,metric,X=X)
         if X_test is not None and y_test is not None:
             y_pred_test = self.get_polyfit(X_test)
@@ -842,17 +1919,216 @@ class Poly(object):
         else:
             return train_score
 
-    def _get_polystd(self, stack_of_points):
+    def get_loo_score(self, metric='rmse'):
+        """
+        Evaluates the leave-one-out cross-validation score of a least squares fit, in closed form. The leave-one-out residual at
+        each sample is its residual divided by one minus the corresponding diagonal entry of the hat matrix, and that diagonal is
+        read off the factorisation of the weighted design matrix; no refitting is required.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param string metric:
+            An optional string containing the scoring metric to use. Avaliable options are: ``adjusted_r2``, ``r2``, ``mae``, ``rmse``, or ``normalised_mae`` (default: ``rmse``).
+        :return:
+            **loo_score**: The leave-one-out score of the model, output as a float.
+        """
+        if self.method != 'least-squares' or self.gradient_flag == 1 or self.mesh == 'sparse-grid':
+            raise ValueError('The leave-one-out score is only available in closed form for least-squares fits.')
+        X = self._quadrature_points
+        y = self._model_evaluations
+        P = self._get_poly_cached(X)
+        factorisation = self._get_design_factorisation(_scale_rows(np.sqrt(self._quadrature_weights), P.T))
+        if factorisation[0] == 'qr':
+            h = np.sum(factorisation[1]**2, axis=1)
+        else:
+            _, U, s, _ = factorisation
+            h = np.sum(U[:, s > np.finfo(float).eps * max(U.shape) * s[0]]**2, axis=1)
+        y_fit = np.dot(P.T, np.asarray(self.coefficients).reshape(len(self.coefficients), -1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y_loo = y - _scale_rows(1.0 / (1.0 - h), y - y_fit)
+        return score(y, y_loo, metric, X=X)
+    def get_kfold_score(self, k=5, metric='rmse', threads=None, random_seed=None):
+        """
+        Evaluates the k-fold cross-validation score of the polynomial approximation, using the selected solver. The polynomial
+        basis is evaluated once at the samples and shared by all the folds, and the folds may be fitted in parallel threads.
+
+        :param Poly self:
+            An instance of the Poly class.
+        :param int k:
+            The number of folds.
+        :param string metric:
+            An optional string containing the scoring metric to use. Avaliable options are: ``adjusted_r2``, ``r2``, ``mae``, ``rmse``, or ``normalised_mae`` (default: ``rmse``).
+        :param int threads:
+            The number of threads used to fit the folds. By default, the folds are fitted one after the other.
+        :param int random_seed:
+            The seed for the random assignment of samples to folds.
+        :return:
+            **kfold_score**: The k-fold score of the model, computed from the out-of-fold predictions at every sample, output as a float.
+        """
+        if self.method == 'numerical-integration' or self.gradient_flag == 1 or self.mesh == 'sparse-grid':
+            raise ValueError('k-fold cross-validation is only available for regression methods without gradients.')
+        X = self._quadrature_points
+        y = self._model_evaluations
+        P = self._get_poly_cached(X)
+        A = _scale_rows(np.sqrt(self._quadrature_weights), P.T)
+        b = _scale_rows(np.sqrt(self._quadrature_weights), y)
+        no_of_points = X.shape[0]
+        if k < 2 or k > no_of_points:
+            raise ValueError('The number of folds must be between 2 and the number of samples.')
+        folds = np.array_split(np.random.default_rng(random_seed).permutation(no_of_points), k)
+        y_cv = np.zeros(y.shape)
+        def fit_fold(test):
+            train = np.ones(no_of_points, dtype=bool)
+            train[test] = False
+            coefficients = self._solve(A[train], b[train])
+            return test, np.dot(P[:, test].T, np.reshape(coefficients, (P.shape[0], -1)))
+        if threads is None:
+            results = list(map(fit_fold, folds))
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                results = list(executor.map(fit_fold, folds))
+        for test, y_test in results:
+            y_cv[test] = y_test.reshape(y_cv[test].shape)
+        return score(y, y_cv, metric, X=X)
+    def select_order(self, orders=None, criterion='loo'):
+        """
+        Selects the order of a least squares fit from a set of candidate orders. The index sets of increasing order are nested, so the
+        columns of the design matrix are ordered by the first order at which they appear and a single QR factorisation is extended
+        column block by column block; each order is then scored from the factorisation alone. The design is weighted, for every
+        candidate, by the Christoffel weights of the largest basis. Candidates with more basis terms than samples, or with a rank
+        deficient design, are not scored. The selected order is then fitted with the data of this polynomial.
+
+        :param Poly self:
+            An instance of the Poly class, whose model has been set.
+        :param list orders:
+            The candidate orders, applied isotropically and capped at the orders of the parameters. By default, every order from 1 up
+            to the highest order of the parameters.
+        :param string criterion:
+            The score of each order: ``loo`` for the root mean squared leave-one-out error, ``aic`` for the Akaike information
+            criterion or ``bic`` for the Bayesian information criterion (default: ``loo``).
+        :return:
+            **poly**: An instance of the Poly class fitted with the selected order.
+
+            **scores**: A numpy.ndarray with the score of every candidate order; unscored orders have an infinite score.
+        """
+        if self.method != 'least-squares' or self.gradient_flag == 1 or self.mesh == 'sparse-grid' or \
+                self.subsampling_algorithm_name is not None or hasattr(self, 'inv_R_Psi'):
+            raise ValueError('Order selection is only available for least-squares fits without gradients or subsampling.')
+        if criterion not in ['loo', 'aic', 'bic']:
+            raise ValueError('The criterion must be one of loo, aic or bic.')
+        if self.basis.basis_type.lower() not in ['univariate', 'total-order', 'tensor-grid', 'hyperbolic-basis', 'euclidean-degree']:
+            raise ValueError('Order selection requires a basis whose index sets are nested in the order.')
+        if orders is None:
+            orders = range(1, int(self.highest_order) + 1)
+        orders = sorted(set(int(order) for order in orders))
+        X = self._quadrature_points
+        y = np.asarray(self._model_evaluations, dtype=float).reshape(X.shape[0], -1)
+        no_of_points = X.shape[0]
+
+        # Order the columns of the largest basis by the first candidate order at which they appear.
+        level = {}
+        for l in range(len(orders) - 1, -1, -1):
+            for index in self._get_candidate_basis(orders[l]).elements.astype(int).tolist():
+                level[tuple(index)] = l
+        elements = np.array(sorted(level, key=lambda index: level[index]), dtype=int)
+        ends = np.cumsum(np.bincount([level[tuple(index)] for index in elements.tolist()], minlength=len(orders)))
+        P = self._get_poly(X, elements)
+        weights = 1.0 / np.sum(P**2, 0)
+        weights = weights / np.sum(weights)
+        A = _scale_rows(np.sqrt(weights), P.T)
+        b = _scale_rows(np.sqrt(weights), y)
+
+        scores = np.inf * np.ones(len(orders))
+        Q = np.zeros((no_of_points, 0))
+        R = np.zeros((0, 0))
+        z = np.zeros((0, y.shape[1]))
+        h = np.zeros(no_of_points)
+        start = 0
+        for l, end in enumerate(ends):
+            if end > no_of_points:
+                break
+            if end > start:
+                Q_new, C, R_new = qr_append_columns(Q, A[:, start:end])
+                R = np.block([[R, C], [np.zeros((end - start, start)), R_new]])
+                if np.min(np.abs(np.diag(R_new))) <= np.sqrt(np.finfo(float).eps) * np.max(np.abs(np.diag(R))):
+                    break
+                Q = np.hstack([Q, Q_new])
+                z = np.vstack([z, np.dot(Q_new.T, b)])
+                h += np.sum(Q_new**2, axis=1)
+                start = end
+            y_fit = np.dot(P[0:end, :].T, solve_triangular(R, z))
+            if criterion == 'loo':
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    y_loo = y - _scale_rows(1.0 / (1.0 - h), y - y_fit)
+                scores[l] = score(y, y_loo, 'rmse')
+            else:
+                rss = np.sum((y - y_fit)**2)
+                penalty = 2.0 if criterion == 'aic' else np.log(no_of_points)
+                scores[l] = no_of_points * np.log(rss / no_of_points) + penalty * end
+        if not np.any(np.isfinite(scores)):
+            raise ValueError('None of the candidate orders could be fitted with the available samples.')
+        best = orders[int(np.argmin(scores))]
+        parameters = deepcopy(self.parameters)
+        for parameter in parameters:
+            parameter.order = min(int(parameter.order), best)
+        sampling_args = dict(self.sampling_args) if self.sampling_args is not None else {}
+        sampling_args['sample-points'] = X
+        sampling_args['sample-outputs'] = np.asarray(self._model_evaluations)
+        sampling_args.pop('subsampling-algorithm', None)
+        poly = Poly(parameters, self._get_candidate_basis(best, orders=False), method='least-squares', sampling_args=sampling_args, \
+                solver_args=self.solver_args)
+        poly.set_model()
+        return poly, scores
+    def _get_candidate_basis(self, order, orders=True):
+        """
+        Private function that returns a basis of the same type as that of the polynomial, with the order applied isotropically and
+        capped at the orders of the parameters. If orders is false, the orders are left to be set from the parameters.
+        """
+        q = self.basis.q if self.basis.q != [] else None
+        if not orders:
+            return Basis(self.basis.basis_type, q=q)
+        return Basis(self.basis.basis_type, orders=[min(int(parameter.order), order) for parameter in self.parameters], q=q)
+    def _get_polystd(self, stack_of_points, return_polyfit=False):
         """
         Private function to evaluate the uncertainty of the polynomial approximation at prescribed points, following the approach from [7].
+        The test points are processed in chunks, and the variance at each point is a row-wise quadratic form with a cached factor of the
+        coefficient covariance, so the cost is O(number_of_observations x cardinality^2).
 
         :param Poly self:
             An instance of the Poly class.
         :param numpy.ndarray stack_of_points:
             An ndarray with shape (number_of_observations, dimensions) at which the polynomial variance must be evaluated at.
+        :param bool return_polyfit:
+            If true, the polynomial approximation at the points is also returned (evaluated on the same chunks).
         :return:
             **y_std**: A numpy.ndarray of shape (number_of_observations,1) corresponding to the uncertainty (one standard deviation) of the polynomial approximation at each point.
         """
+        if self._polystd_factor is None:
+            if self._training_data_released:
+                raise ValueError('The training data of this polynomial have been released; call release_training_data with keep_uncertainty=True to keep the uncertainty.')
+            self._polystd_factor = self._get_polystd_factor()
+        F = self._polystd_factor
+        coefficients = np.asarray(self.coefficients).reshape(-1, 1)
+        stack_of_points = self._get_stack_of_points(stack_of_points)
+        no_of_points = stack_of_points.shape[0]
+        y_fit = np.zeros((no_of_points, 1))
+        std_F = np.zeros((no_of_points, 1))
+        chunk = max(1, int(MAXIMUM_CHUNK_SIZE // F.shape[0]))
+        for start in range(0, no_of_points, chunk):
+            # Construct A matrix for test points, but omit weights
+            Ao = self.get_poly(stack_of_points[start:start+chunk]).T
+            y_fit[start:start+chunk] = np.dot(Ao, coefficients)
+            std_F[start:start+chunk, 0] = 1.96 * np.sqrt( np.sum( np.dot(Ao, F)**2, axis=1) )
+        if return_polyfit:
+            return y_fit, std_F
+        return std_F
+    def _get_polystd_factor(self):
+        """
+        Private function that returns a factor F of the covariance of the polynomial coefficients, Sigma_X = F F^T.
+
+        With R the triangular factor of the (lightly regularised) weighted design matrix A, and R_G the triangular factor of diag(sqrt(variance)) A R^{-1},
+        Sigma_X = R^{-1} R_G^T R_G R^{-T}, so F = R^{-1} R_G^T. No explicit inverse and no matrices of size number_of_observations squared are formed.
+        """
         # Training data
         X_train = self.inputs
         y_train = self.outputs
@@ -860,7 +2136,8 @@ class Poly(object):
         # Define covariance matrix - TODO: allow non-diagonal matrix?
         # Empirical variance
         if self.output_variances is None:
-            mse = ((y_train - self.get_polyfit(X_train))**2).mean()
+            y_fit = np.dot(self._get_poly_cached(X_train).T, np.asarray(self.coefficients).reshape(-1, 1))
+            mse = ((y_train - y_fit)**2).mean()
             data_variance = np.full(X_train.shape[0],mse)
         # User defined variance (scalar)
         elif np.isscalar(self.output_variances):
@@ -868,36 +2145,218 @@ class Poly(object):
         # User defined variance (array)
         else:
             data_variance = self.output_variances
-        Sigma = np.diag(data_variance)
+        data_variance = np.asarray(data_variance).reshape(-1)
 
-        # Construct Q, the pseudoinverse of the weighted orthogonal polynomial matrix P
- 
-        P = self.get_poly(self._quadrature_points)
-        W = np.diag(np.sqrt(self._quadrature_weights))
-        A = np.dot(W, P.T)
-        Q = np.dot( _inv( np.dot(A.T, A) ), A.T)
-
-        # Construct A matrix for test points, but omit weights
-        X_test = stack_of_points
-        Po = self.get_poly(X_test)
-        Ao = Po.T
+        # Triangular factor of the weighted orthogonal polynomial matrix; R^T R = A^T A + 1e-10 I
+        P = self._get_poly_cached(self._quadrature_points)
+        A = _scale_rows(np.sqrt(self._quadrature_weights), P.T)
+        nn = A.shape[1]
+        R = np.linalg.qr(np.vstack([A, np.sqrt(1e-10) * np.eye(nn)]), mode='r')
 
         # Propagate the uncertainties
-        Sigma_X = np.dot( np.dot(Q, Sigma), Q.T)
-        Sigma_F = np.dot( np.dot(Ao, Sigma_X), Ao.T) 
-        std_F = 1.96 * np.sqrt( np.diag(Sigma_F) )
-        return std_F.reshape(-1,1)
+        G = solve_triangular(R, _scale_rows(np.sqrt(data_variance), A).T, trans='T').T
+        R_G = np.linalg.qr(G, mode='r')
+        return solve_triangular(R, R_G.T)
 
-def _inv(M):
+def _get_product_coefficients(parameters, elements_a, a, elements_b, b, square=False):
+    """
+    Returns the multi-index set and the coefficients of the product of two expansions in the orthonormal polynomials of the parameters.
+    The coefficient of the term gamma is sum over the pairs (alpha, beta) of a_alpha b_beta prod_k E[p_alpha_k p_beta_k p_gamma_k], with
+    the univariate linearization coefficients tabulated per parameter. Terms with a zero coefficient are skipped, and for a square only
+    the pairs alpha <= beta are visited. The coefficient arrays have one column per output.
+    """
+    active_a = np.flatnonzero(np.any(a != 0.0, axis=1))
+    active_b = np.flatnonzero(np.any(b != 0.0, axis=1))
+    if square:
+        active_b = active_a
+    elements_a, a = np.asarray(elements_a)[active_a].astype(int), a[active_a]
+    elements_b, b = np.asarray(elements_b)[active_b].astype(int), b[active_b]
+    dimensions = elements_a.shape[1]
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((1, dimensions), dtype=int), np.zeros((1, max(a.shape[1], b.shape[1])))
+    if square:
+        I, J = np.triu_indices(len(a))
+        W = a[I] * b[J] * np.where(I == J, 1.0, 2.0).reshape(-1, 1)
+    else:
+        I, J = np.meshgrid(np.arange(len(a)), np.arange(len(b)), indexing='ij')
+        I, J = I.reshape(-1), J.reshape(-1)
+        W = a[I] * b[J]
+    alpha, beta = elements_a[I], elements_b[J]
+    elements = _get_downward_closure(np.unique(alpha + beta, axis=0))
+    tables = [parameters[k].get_linearization_coefficients(max(np.max(elements_a[:,k]), np.max(elements_b[:,k]))) \
+            for k in range(0, dimensions)]
+    coefficients = np.zeros((len(elements), W.shape[1]))
+    chunk = max(1, int(MAXIMUM_CHUNK_SIZE // len(W)))
+    for start in range(0, len(elements), chunk):
+        gamma = elements[start:start+chunk]
+        T = np.ones((len(W), len(gamma)))
+        for k in range(0, dimensions):
+            T *= tables[k][alpha[:,k].reshape(-1, 1), beta[:,k].reshape(-1, 1), gamma[:,k].reshape(1, -1)]
+        coefficients[start:start+chunk] = np.dot(T.T, W)
+    return elements, coefficients
+def _get_downward_closure(elements):
+    """
+    Returns the smallest downward closed multi-index set that contains the given multi-indices, sorted by total order so that the
+    first multi-index is zero.
+    """
+    closure = set(map(tuple, np.asarray(elements).astype(int).tolist()))
+    frontier = list(closure)
+    while frontier:
+        lowered = []
+        for index in frontier:
+            for k in range(0, len(index)):
+                if index[k] > 0:
+                    candidate = index[0:k] + (index[k] - 1,) + index[k+1:]
+                    if candidate not in closure:
+                        closure.add(candidate)
+                        lowered.append(candidate)
+        frontier = lowered
+    closure = np.array(sorted(closure, key=lambda index: (sum(index), index[::-1])), dtype=int)
+    return closure.reshape(-1, np.asarray(elements).shape[1])
+def _get_untrained_poly(parameters, basis, coefficients, method=None, solver_args=None, gradient_flag=0, mesh=None, \
+        pruning_tolerance=None, inv_R_Psi=None):
+    """
+    Private function that returns a polynomial with prescribed coefficients and no training data. Training artefacts that can be
+    recomputed from the parameters and the basis are recomputed on first access; see ``Poly.release_training_data``.
+    """
+    poly = Poly.__new__(Poly)
+    poly.parameters = parameters
+    poly.basis = basis
+    poly.method = method
+    poly.sampling_args = None
+    poly.solver_args = solver_args
+    poly.dimensions = len(parameters)
+    poly.orders = [parameter.order for parameter in parameters]
+    poly.gradient_flag = gradient_flag
+    poly._set_default_values()
+    poly.pruning_tolerance = pruning_tolerance
+    poly.parameters_order = list(poly.orders)
+    poly.highest_order = np.max(poly.parameters_order)
+    if mesh is not None:
+        poly.mesh = mesh
+    poly.coefficients = coefficients
+    if inv_R_Psi is not None:
+        poly.inv_R_Psi = inv_R_Psi
+    if poly.method is not None:
+        poly._set_solver()
+    poly._training_data_released = True
+    return poly
+def _to_json(value):
+    """
+    Returns a value with any numpy scalars or arrays converted to Python numbers and lists.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+def _load_npz_member(filename, archive, name, mmap_mode):
+    """
+    Returns an array of an .npz archive. Members that are stored uncompressed are memory-mapped in place, by locating the data past
+    the local zip header and the .npy header; other members are read into memory.
+    """
+    info = archive.getinfo(name)
+    if mmap_mode is None or info.compress_type != zipfile.ZIP_STORED:
+        return np.lib.format.read_array(archive.open(name), allow_pickle=False)
+    with open(filename, 'rb') as f:
+        f.seek(info.header_offset)
+        local_header = f.read(30)
+        name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if dtype.hasobject:
+        raise ValueError('Saved polynomials cannot hold object arrays.')
+    if int(np.prod(shape)) == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode=mmap_mode, offset=offset, shape=shape, order='F' if fortran_order else 'C')
+def _get_trie_plan(basis):
+    """
+    Returns the plan for evaluating a multi-index set along its prefix tree. The nodes at depth k are the distinct prefixes
+    (alpha_0, ..., alpha_k); each node whose last order is nonzero owns a row of partial products, equal to the row of its parent times
+    the univariate polynomial of that order, while a node whose last order is zero shares the row of its parent. The plan holds the
+    number of rows, a list of steps (dimension, first row written, parent rows, orders) and the row of every multi-index.
+    """
+    basis = np.asarray(basis).astype(int)
+    basis_entries, dimensions = basis.shape
+    node = np.zeros(basis_entries, dtype=int)
+    node_rows = np.zeros(1, dtype=int)
+    number_of_rows = 1
+    steps = []
+    for k in range(0, dimensions):
+        width = int(np.max(basis[:,k])) + 1
+        prefixes, node = np.unique(node * width + basis[:,k], return_inverse=True)
+        parent_rows = node_rows[prefixes // width]
+        orders = prefixes % width
+        computed = orders > 0
+        node_rows = parent_rows.copy()
+        node_rows[computed] = number_of_rows + np.arange(np.sum(computed))
+        if np.any(computed):
+            steps.append((k, number_of_rows, parent_rows[computed], orders[computed]))
+        number_of_rows += int(np.sum(computed))
+    return number_of_rows, steps, node_rows[node]
+def _get_univariate_differentiation_matrix(parameter, order):
+    """
+    Returns the lower triangular matrix D, of shape (order+1, order+1), such that the derivative of the orthonormal polynomial of order
+    u of the parameter is sum_j D[u,j] p_j. Differentiating the three-term recurrence gives
+        sqrt(b_u) p_u' = p_{u-1} + (x - a_{u-1}) p_{u-1}' - sqrt(b_{u-1}) p_{u-2}'
+    where multiplication by x acts on the coefficients through x p_j = sqrt(b_{j+1}) p_{j+1} + a_j p_j + sqrt(b_j) p_{j-1}.
+    """
+    D = np.zeros((order + 1, order + 1))
+    if order == 0:
+        return D
+    ab = parameter.get_recurrence_coefficients(order + 1)
+    a = ab[:,0]
+    sqrt_b = np.sqrt(ab[:,1])
+    for u in range(1, order + 1):
+        row = np.zeros(order + 1)
+        row[u-1] = 1.0
+        previous = D[u-1, 0:u-1]
+        j = np.arange(0, u - 1)
+        row[j + 1] += sqrt_b[j + 1] * previous
+        row[j] += (a[j] - a[u-1]) * previous
+        row[j[1:] - 1] += sqrt_b[j[1:]] * previous[1:]
+        if u >= 2:
+            row -= sqrt_b[u-1] * D[u-2]
+        D[u] = row / sqrt_b[u]
+    return D
+def _get_tsqr_factor(poly, X, y):
+    """
+    Private function that returns the triangular factor of the Christoffel weighted design matrix of a chunk, augmented with the
+    weighted outputs.
+    """
+    X = poly._get_stack_of_points(np.asarray(X, dtype=float))
+    y = np.asarray(y, dtype=float).reshape(X.shape[0], -1)
+    P = poly.get_poly(X)
+    if hasattr(poly, 'inv_R_Psi'):
+        w = np.sqrt(1.0 / np.sum(poly._get_poly(X, poly.basis.elements)**2, 0))
+    else:
+        w = np.sqrt(1.0 / np.sum(P**2, 0))
+    A = np.hstack([_scale_rows(w, P.T), _scale_rows(w, y)])
+    del P
+    # Factorising blocks of a few times the number of columns, and then their stacked factors, is faster than one tall QR.
+    block = 8 * A.shape[1]
+    return _combine_tsqr_factors(None, [np.linalg.qr(A[i:i+block], mode='r') for i in range(0, A.shape[0], block)])
+def _combine_tsqr_factors(R, factors):
+    """
+    Private function that reduces a list of triangular factors (and an optional running factor R) to a single triangular factor.
+    """
+    if R is not None:
+        factors = [R] + list(factors)
+    return np.linalg.qr(np.vstack(factors), mode='r')
+_streaming_poly = None
+def _set_streaming_poly(poly):
     """
-    Private function to compute inverse of matrix M, where M is a numpy.ndarray.
+    Private function that initialises each process of the pool used by ``Poly.set_model_streaming``.
     """
-    ll, mm = M.shape
-    M2 = M + 1e-10 * np.eye(ll)
-    L = np.linalg.cholesky(M2)
-    inv_L = np.linalg.inv(L)
-    inv_M = inv_L.T @ inv_L
-    return inv_M
+    global _streaming_poly
+    _streaming_poly = poly
+def _get_streamed_tsqr_factor(X, y):
+    return _get_tsqr_factor(_streaming_poly, X, y)
 
 def evaluate_model_gradients(points, fungrad, format):
     """
@@ -944,14 +2403,18 @@ def evaluate_model(points, function):
     :param numpy.ndarray points:
         An ndarray with shape (number_of_observations, dimensions) at which the gradient must be evaluated.
     :param callable function:
-        A callable argument for the function.
+        A callable argument for the function. It may return a scalar, or a vector of outputs.
 
     :return:
-        **function_values**: A numpy.ndarray of function evaluations.
+        **function_values**: A numpy.ndarray of function evaluations of shape (number_of_observations, number_of_outputs).
     """
-    function_values = np.zeros((len(points), 1))
-    for i in range(0, len(points)):
-        function_values[i,0] = function(points[i,:])
+    if len(points) == 0:
+        return np.zeros((0, 1))
+    first_value = np.ravel(function(points[0,:]))
+    function_values = np.zeros((len(points), len(first_value)))
+    function_values[0,:] = first_value
+    for i in range(1, len(points)):
+        function_values[i,:] = np.ravel(function(points[i,:]))
     return function_values
 def vector_to_2D_grid(coefficients, index_set):
     """
@@ -979,18 +2442,11 @@ def vector_to_2D_grid(coefficients, index_set):
     coefficients = np.reshape(coefficients, (1, l))
     z[indices[:,0], indices[:,1]] = coefficients
     return x, y, z, max_order
-def cell2matrix(G, W):
+def cell2matrix(G, w):
     dimensions = len(G)
     G0 = G[0] # Which by default has to exist!
-    C0 = G0.T
-    rows, cols = C0.shape
+    cols, rows = G0.shape
     BigC = np.zeros((dimensions*rows, cols))
-    counter = 0
     for i in range(0, dimensions):
-        K = np.dot(W, G[i].T)
-        for j in range(0, rows):
-            for k in range(0,cols):
-                BigC[counter,k] = K[j,k]
-            counter = counter + 1
-    BigC = np.mat(BigC)
+        BigC[i*rows:(i+1)*rows, :] = _scale_rows(w, G[i].T) # w holds the square root of the quadrature weights
     return BigC
@@ -0,0 +1,147 @@
+"""Batched evaluation of many polynomials that share their parameters and basis."""
+from equadratures.poly import EVALUATION_CHUNK_SIZE
+import numpy as np
+RECURRENCE_TOLERANCE = 1e-10
+class PolyBank(object):
+    """
+    Definition of a bank of polynomials: many fitted polynomials with the same basis and the same types of parameters, but different
+    coefficients and domains, such as the leaves of a PolyTree or a set of per-sensor surrogates. The parameters of every member must be
+    affine images of those of the first member (for instance uniform parameters over different intervals, or Gaussian parameters with
+    different means and variances), which is checked from their recurrence coefficients. The points of each member are mapped onto
+    the domain of the first, so that all members are evaluated with a single evaluation of the polynomial basis, contracted with the
+    matrix of their stacked coefficients.
+
+    :param list polys: A list of fitted instances of the Poly class, each with a single output.
+
+    **Sample constructor initialisations**::
+
+        import numpy as np
+        from equadratures import *
+
+        polys = []
+        for lower in [-1., 0., 1.]:
+            param = Parameter(distribution='uniform', lower=lower, upper=lower + 1., order=3)
+            poly = Poly(parameters=[param, param], basis=Basis('total-order'), method='numerical-integration')
+            poly.set_model(lambda x: np.exp(x[0] + x[1]))
+            polys.append(poly)
+        bank = PolyBank(polys)
+        X = np.random.uniform(-1., 2., (100, 2))
+        Y = bank.get_polyfit(X)
+        y = bank.get_polyfit(X, assignments=np.random.randint(0, 3, 100))
+    """
+    def __init__(self, polys):
+        polys = list(polys)
+        if len(polys) == 0:
+            raise ValueError('A PolyBank needs at least one polynomial.')
+        reference = polys[0]
+        elements = np.asarray(reference.basis.elements)
+        dimensions = reference.dimensions
+        max_orders = np.max(elements, axis=0).astype(int)
+        reference_ab = [reference.parameters[k].get_recurrence_coefficients(max_orders[k] + 1) for k in range(0, dimensions)]
+        scales = np.ones((len(polys), dimensions))
+        shifts = np.zeros((len(polys), dimensions))
+        coefficients = np.zeros((elements.shape[0], len(polys)))
+        for m, poly in enumerate(polys):
+            if poly.dimensions != dimensions or not np.array_equal(np.asarray(poly.basis.elements), elements):
+                raise ValueError('The polynomials of a PolyBank must share their basis.')
+            if poly._get_number_of_outputs() > 1:
+                raise ValueError('The polynomials of a PolyBank must have a single output.')
+            for k in range(0, dimensions):
+                if max_orders[k] == 0:
+                    continue
+                # If the parameter is the image of the reference parameter under x -> a + s x, its recurrence coefficients are
+                # alpha_n = a + s alpha_n' and beta_n = s^2 beta_n', and its polynomials at x are those of the reference at (x - a) / s.
+                ab = poly.parameters[k].get_recurrence_coefficients(max_orders[k] + 1)
+                scale = np.sqrt(reference_ab[k][1, 1] / ab[1, 1])
+                shift = reference_ab[k][0, 0] - scale * ab[0, 0]
+                tolerance = RECURRENCE_TOLERANCE * max(np.max(np.abs(reference_ab[k][:, 0])), np.max(reference_ab[k][1:, 1]), 1.0)
+                if not (np.allclose(scale * ab[:, 0] + shift, reference_ab[k][:, 0], rtol=RECURRENCE_TOLERANCE, atol=tolerance) and \
+                        np.allclose(scale**2 * ab[1:, 1], reference_ab[k][1:, 1], rtol=RECURRENCE_TOLERANCE, atol=tolerance)):
+                    raise ValueError('The parameters of the polynomials of a PolyBank must be affine images of one another; parameter ' \
+                            + str(k) + ' of polynomial ' + str(m) + ' is not.')
+                scales[m, k] = scale
+                shifts[m, k] = shift
+            # As in Poly.get_polyfit, any Gram-Schmidt correction is folded into the coefficients and pruned terms are dropped.
+            c = np.asarray(poly.coefficients, dtype=np.float64).reshape(-1)
+            if hasattr(poly, 'inv_R_Psi'):
+                c = np.dot(poly.inv_R_Psi, c)
+            if poly.pruning_tolerance is not None:
+                active = poly._get_active_indices(c)
+                coefficients[active, m] = c[active]
+            else:
+                coefficients[:, m] = c
+        self._reference = reference
+        self._elements = elements
+        self._scales = scales
+        self._shifts = shifts
+        self._coefficients = coefficients
+        self._shared_domain = bool(np.all(scales == scales[0]) and np.all(shifts == shifts[0]))
+    def __len__(self):
+        return self._coefficients.shape[1]
+    def get_coefficients(self):
+        """
+        Returns the stacked coefficients of the members.
+
+        :param PolyBank self:
+            An instance of the PolyBank class.
+        :return:
+            **coefficients**: A numpy.ndarray of shape (cardinality, number_of_polys), with one column per member.
+        """
+        return self._coefficients
+    def get_multi_index(self):
+        """
+        Returns the multi-index set shared by the members.
+
+        :param PolyBank self:
+            An instance of the PolyBank class.
+        :return:
+            **multi_indices**: A numpy.ndarray of shape (cardinality, dimensions).
+        """
+        return self._elements
+    def get_polyfit(self, stack_of_points, assignments=None, dtype=np.float64):
+        """
+        Evaluates the members at prescribed points: either every member at every point, or one assigned member at each point.
+
+        :param PolyBank self:
+            An instance of the PolyBank class.
+        :param numpy.ndarray stack_of_points:
+            An ndarray with shape (number_of_observations, dimensions).
+        :param numpy.ndarray assignments:
+            An optional ndarray of integers with shape (number_of_observations,), the index of the member to evaluate at each point.
+        :param numpy.dtype dtype:
+            The floating point type in which the polynomial basis is evaluated (see ``Poly.get_polyfit``); the terms are summed in
+            double precision.
+        :return:
+            **p**: A numpy.ndarray of shape (number_of_observations, number_of_polys) of the members at the points; or, with assignments,
+            a numpy.ndarray of shape (number_of_observations, 1) of the assigned member at each point.
+        """
+        X = self._reference._get_stack_of_points(stack_of_points)
+        no_of_points = X.shape[0]
+        cardinality, number_of_polys = self._coefficients.shape
+        if assignments is not None:
+            assignments = np.asarray(assignments).astype(int).reshape(-1)
+            if len(assignments) != no_of_points or np.any(assignments < 0) or np.any(assignments >= number_of_polys):
+                raise ValueError('There must be one assignment per point, each the index of a member of the PolyBank.')
+            values = np.zeros((no_of_points, 1))
+            chunk = max(1, int(EVALUATION_CHUNK_SIZE // max(cardinality, 1)))
+            for start in range(0, no_of_points, chunk):
+                a = assignments[start:start+chunk]
+                P = self._reference._get_poly(X[start:start+chunk] * self._scales[a] + self._shifts[a], self._elements, dtype)
+                values[start:start+chunk, 0] = np.einsum('kn,kn->n', P, self._coefficients[:, a])
+            return values
+        values = np.zeros((no_of_points, number_of_polys))
+        if self._shared_domain:
+            chunk = max(1, int(EVALUATION_CHUNK_SIZE // max(cardinality, 1)))
+            for start in range(0, no_of_points, chunk):
+                P = self._reference._get_poly(X[start:start+chunk] * self._scales[0] + self._shifts[0], self._elements, dtype)
+                values[start:start+chunk] = np.dot(P.T, self._coefficients)
+            return values
+        # The points of every member are stacked, so that the basis is evaluated once for all of them.
+        chunk = max(1, int(EVALUATION_CHUNK_SIZE // max(cardinality * number_of_polys, 1)))
+        for start in range(0, no_of_points, chunk):
+            Xc = X[start:start+chunk]
+            n = Xc.shape[0]
+            mapped = Xc[np.newaxis, :, :] * self._scales[:, np.newaxis, :] + self._shifts[:, np.newaxis, :]
+            P = self._reference._get_poly(mapped.reshape(number_of_polys * n, -1), self._elements, dtype)
+            values[start:start+n] = np.einsum('kmn,km->nm', P.reshape(cardinality, number_of_polys, n), self._coefficients)
+        return values
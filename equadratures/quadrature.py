@@ -25,6 +25,7 @@ class Quadrature(object):
             self.samples = Sparsegrid(self.parameters, self.basis)
             self.list = self.samples.tensor_product_list
             self.sparse_weights = self.samples.sparse_weights
+            self.sparse_point_indices = self.samples.tensor_point_indices
         elif self.mesh.lower() == 'monte-carlo':
             self.samples = Montecarlo(self.parameters, self.basis, corr, oversampling)
             self.list = None
@@ -36,30 +36,22 @@ class Sparsegrid(Sampling):
         # For storage we use dictionaries
         points_store = {}
         weights_store = {}
-        indices = np.zeros((rows))
         self.tensor_product_list = []
         for i in range(0,rows):
             orders = sparse_indices[i,:]
             myBasis = Basis('tensor-grid')
             myTensor = Tensorgrid(parameters=self.parameters, basis=myBasis, orders=orders.astype(int) )
             self.tensor_product_list.append(myTensor)
-            pts = myTensor.points
-            wts = myTensor.weights * sparse_factors[i]
-            points_store[i] = pts
-            weights_store[i] = wts
-            indices[i] = myTensor.basis.cardinality
+            points_store[i] = myTensor.points
+            weights_store[i] = myTensor.weights * sparse_factors[i]
             del myTensor, myBasis
-        sum_indices = int(np.sum(indices))
-        points_saved = np.zeros((sum_indices, self.basis.dimensions))
-        weights_saved = np.zeros((sum_indices))
-        counter = int(0)
-        for i in range(0,rows):
-            for j in range(0, int(indices[i])):
-                for d in range(0, self.basis.dimensions):
-                    points_saved[counter,d] = points_store[i][j, d]
-                weights_saved[counter] = weights_store[i][j]
-                counter = counter + 1
-        self.points , indices = np.unique(points_saved, axis=0, return_index=True)
+        points_saved = np.vstack([points_store[i] for i in range(0, rows)])
+        weights_saved = np.hstack([weights_store[i] for i in range(0, rows)])
+        self.points , indices, inverse = np.unique(points_saved, axis=0, return_index=True, return_inverse=True)
         self.weights = weights_saved[indices]
+        # The rows of the sparse grid at which the points of each tensor grid lie.
+        offsets = np.cumsum([0] + [len(points_store[i]) for i in range(0, rows)])
+        inverse = inverse.reshape(-1)
+        self.tensor_point_indices = [inverse[offsets[i]:offsets[i+1]] for i in range(0, rows)]
         self.sparse_indices = sparse_indices
         self.sparse_weights = sparse_factors
@@ -1,6 +1,8 @@
 """Solvers for computing of a linear system."""
 import numpy as np
-from scipy.linalg import qr
+from scipy.linalg import qr, solve_triangular
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import LinearOperator, lsqr
 from scipy.optimize import linprog, minimize
 from scipy.special import huber as huber_loss
 from copy import deepcopy
@@ -17,6 +19,12 @@ class Solver(object):
     :param dict solver_args: Optional arguments centered around the specific solver.
             :param numpy.ndarray noise-level: The noise-level to be used in the basis pursuit de-noising solver.
             :param bool verbose: Default value of this input is set to ``False``; when ``True`` a string is printed to the screen detailing the solver convergence and condition number of the matrix.
+            :param string sketch: For ``least-squares`` only; set to ``count-sketch`` (recommended) or ``srht`` (subsampled randomised Hadamard transform) to solve highly overdetermined systems by sketch-and-precondition [1] instead of a dense SVD.
+            :param float sketch-oversampling: The number of sketched rows as a multiple of the number of columns. Default value is 8.
+            :param int random-seed: The seed of the random sketch.
+
+    **References**
+        1. Avron, H., Maymounkov, P., Toledo, S., (2010) Blendenpik: Supercharging LAPACK's Least-Squares Solver. SIAM Journal on Scientific Computing, 32(3). `Paper <https://epubs.siam.org/doi/10.1137/090767911>`__
     """
     def __init__(self, method, solver_args):
         self.method = method
@@ -27,6 +35,9 @@ class Solver(object):
         self.verbose = False
         self.max_iter = None
         self.opt = 'osqp'
+        self.sketch = None
+        self.sketch_oversampling = 8.0
+        self.random_seed = None
         if self.solver_args is not None:
             if 'noise-level' in self.solver_args: self.noise_level = solver_args.get('noise-level')
             if 'param1' in self.solver_args: self.param1 = solver_args.get('param1')
@@ -34,10 +45,17 @@ class Solver(object):
             if 'verbose' in self.solver_args: self.verbose = solver_args.get('verbose')
             if 'max-iter' in self.solver_args: self.max_iter = solver_args.get('max-iter')
             if 'optimiser' in self.solver_args: self.opt = solver_args.get('optimiser')
+            if 'sketch' in self.solver_args: self.sketch = solver_args.get('sketch')
+            if 'sketch-oversampling' in self.solver_args: self.sketch_oversampling = float(solver_args.get('sketch-oversampling'))
+            if 'random-seed' in self.solver_args: self.random_seed = solver_args.get('random-seed')
         if self.opt=='osqp' and not cvxpy: 
             self.opt='scipy'
         if self.method.lower() == 'compressed-sensing' or self.method.lower() == 'compressive-sensing':
             self.solver = lambda A, b: basis_pursuit_denoising(A, b, self.noise_level, self.verbose)
+        elif self.method.lower() == 'least-squares' and self.sketch is not None:
+            if self.sketch.lower() not in ['count-sketch', 'srht']:
+                raise ValueError('The sketch must be one of count-sketch or srht.')
+            self.solver = lambda A, b: randomised_least_squares(A, b, self.sketch, self.sketch_oversampling, self.random_seed, self.verbose)
         elif self.method.lower() == 'least-squares':
             self.solver = lambda A, b: least_squares(A, b, self.verbose)
         elif self.method.lower() == 'minimum-norm':
@@ -66,6 +84,148 @@ def least_squares(A, b, verbose):
     if verbose is True:
         print('The condition number of the matrix is '+str(np.linalg.cond(A))+'.')
     return alpha[0]
+def randomised_least_squares(A, b, sketch='count-sketch', oversampling=8.0, random_seed=None, verbose=False):
+    """
+    Solves a highly overdetermined least squares problem by sketch-and-precondition. A random sketch SA, with a few times more rows
+    than columns, is factorised as QR; A R^{-1} is then well conditioned, so LSQR converges to full accuracy in a few tens of
+    iterations. The cost is O(mn log m + n^3) for srht and O(nnz(A) + n^3) for count-sketch, against O(mn^2) for a dense solve.
+    Falls back to ``least_squares`` when the system is not sufficiently overdetermined, or the sketch is rank deficient.
+    """
+    m, n = A.shape
+    s = int(np.ceil(oversampling * n))
+    if m <= s:
+        return least_squares(A, b, verbose)
+    rng = np.random.default_rng(random_seed)
+    b = np.asarray(b, dtype=float)
+    if sketch.lower() == 'srht':
+        SM = _srht(np.hstack([A, b.reshape(m, -1)]), s, rng)
+        SA, Sb = SM[:, 0:n], SM[:, n:]
+    else:
+        S = csr_matrix((rng.choice([-1.0, 1.0], m), (rng.integers(0, s, m), np.arange(m))), shape=(s, m))
+        SA = S @ A
+        Sb = S @ b.reshape(m, -1)
+    Q, R = np.linalg.qr(SA)
+    diagonal = np.abs(np.diag(R))
+    if np.min(diagonal) <= np.max(diagonal) * s * np.finfo(float).eps:
+        return least_squares(A, b, verbose)
+    preconditioned_A = LinearOperator((m, n), matvec=lambda y: np.dot(A, solve_triangular(R, y)), \
+            rmatvec=lambda r: solve_triangular(R, np.dot(A.T, r), trans='T'), dtype=float)
+    # The sketched solution is a good starting point.
+    Y0 = np.dot(Q.T, Sb)
+    x = np.zeros((n, Y0.shape[1]))
+    for j in range(0, Y0.shape[1]):
+        result = lsqr(preconditioned_A, b.reshape(m, -1)[:, j], atol=1e-15, btol=1e-15, iter_lim=10 * n, x0=Y0[:, j])
+        if verbose is True:
+            print('LSQR stopped after '+str(result[2])+' iterations; the condition number of the preconditioned matrix is estimated to be '+str(result[6])+'.')
+        x[:, j] = solve_triangular(R, result[0])
+    return x.reshape((n,) + b.shape[1:])
+def _srht(M, s, rng):
+    """
+    Returns s rows of the randomised Hadamard transform of M, scaled so that the sketch preserves norms in expectation.
+    """
+    m, k = M.shape
+    m_padded = 1 << int(np.ceil(np.log2(m)))
+    H = np.zeros((m_padded, k))
+    H[0:m] = _scale_rows(rng.choice([-1.0, 1.0], m), M)
+    # Fast Walsh-Hadamard transform along the rows.
+    h = 1
+    while h < m_padded:
+        H = H.reshape(-1, 2, h, k)
+        H = np.concatenate([H[:, 0] + H[:, 1], H[:, 0] - H[:, 1]], axis=1)
+        h *= 2
+    H = H.reshape(m_padded, k)
+    rows = rng.choice(m_padded, s, replace=False)
+    return H[rows] / np.sqrt(s)
+def least_squares_factorisation(A):
+    """
+    Factorises A for repeated least squares solves. A thin QR factorisation is used when A has full column rank; otherwise a thin
+    SVD is used, so that the minimum norm solution returned by ``least_squares`` is reproduced.
+    """
+    m, n = A.shape
+    if m >= n:
+        Q, R = np.linalg.qr(A)
+        diagonal = np.abs(np.diag(R))
+        if n == 0 or np.min(diagonal) > np.max(diagonal) * max(m, n) * np.finfo(float).eps:
+            return ('qr', Q, R)
+    U, s, Vt = np.linalg.svd(A, full_matrices=False)
+    return ('svd', U, s, Vt)
+def factorised_least_squares(factorisation, b, verbose=False):
+    """
+    Solves the least squares problem min ||Ax - b|| given the output of ``least_squares_factorisation(A)``, at O(mn) cost.
+    """
+    if factorisation[0] == 'qr':
+        _, Q, R = factorisation
+        if verbose is True:
+            print('The condition number of the matrix is '+str(np.linalg.cond(R))+'.')
+        return solve_triangular(R, np.dot(Q.T, b))
+    _, U, s, Vt = factorisation
+    if verbose is True:
+        print('The condition number of the matrix is '+str(s[0] / s[-1])+'.')
+    cutoff = _get_singular_value_cutoff(U, s, Vt)
+    s_inv = np.zeros(len(s))
+    s_inv[s > cutoff] = 1.0 / s[s > cutoff]
+    return np.dot(Vt.T, _scale_rows(s_inv, np.dot(U.T, b)))
+def factorisation_rank(factorisation):
+    """
+    Returns the numerical rank of A given the output of ``least_squares_factorisation(A)``; the QR factorisation is only returned
+    when A has full column rank.
+    """
+    if factorisation[0] == 'qr':
+        return factorisation[2].shape[1]
+    _, U, s, Vt = factorisation
+    return int(np.sum(s > _get_singular_value_cutoff(U, s, Vt)))
+def _get_singular_value_cutoff(U, s, Vt):
+    return np.finfo(float).eps * max(U.shape[0], Vt.shape[1]) * s[0] if len(s) > 0 else 0.0
+def qr_append_rows(R, z, A_new, b_new):
+    """
+    Updates the triangular factor R of A, and z = Q^T b, when the rows A_new and entries b_new are appended to A and b. Each column
+    is annihilated by one Householder reflection on the block of new rows, so the cost is O(rows x n^2) and Q is never formed.
+    """
+    R = np.array(R, dtype=float)
+    z = np.array(z, dtype=float).reshape(R.shape[0], -1)
+    U = np.array(A_new, dtype=float)
+    c = np.array(b_new, dtype=float).reshape(U.shape[0], -1)
+    n = R.shape[1]
+    for j in range(0, n):
+        u = U[:, j]
+        norm_u = np.linalg.norm(u)
+        if norm_u == 0.0:
+            continue
+        r = R[j, j]
+        alpha = -np.copysign(np.hypot(r, norm_u), r)
+        v0 = r - alpha
+        beta = 1.0 / (alpha * v0)
+        w = beta * (v0 * R[j, j+1:] + np.dot(u, U[:, j+1:]))
+        R[j, j+1:] += v0 * w
+        U[:, j+1:] += np.outer(u, w)
+        w = beta * (v0 * z[j, :] + np.dot(u, c))
+        z[j, :] += v0 * w
+        c += np.outer(u, w)
+        R[j, j] = alpha
+        U[:, j] = 0.0
+    return R, z
+def qr_append_columns(Q, B):
+    """
+    Extends the thin QR factorisation of A, with orthonormal factor Q, to that of [A, B]. The new columns are orthogonalised against
+    Q by block classical Gram-Schmidt with one reorthogonalisation pass, and the remainder is factorised by a thin QR. Returns the
+    orthonormal columns Q_B appended to Q, the block C = Q^T B above the diagonal and the new triangular block R_B, so that
+    [A, B] = [Q, Q_B] [[R, C], [0, R_B]].
+    """
+    B = np.array(B, dtype=float)
+    C = np.zeros((Q.shape[1], B.shape[1]))
+    if Q.shape[1] > 0:
+        for _ in range(0, 2):
+            correction = np.dot(Q.T, B)
+            B -= np.dot(Q, correction)
+            C += correction
+    Q_B, R_B = np.linalg.qr(B)
+    return Q_B, C, R_B
+def _scale_rows(w, M):
+    """
+    Private function that returns diag(w) M, where w is a vector and M a numpy.ndarray with as many rows as w, without forming diag(w).
+    """
+    M = np.asarray(M)
+    return np.asarray(w).reshape((-1,) + (1,) * (M.ndim - 1)) * M
 def minimum_norm(A, b):
     Q, R, pvec = qr(A, pivoting=True)
     m, n = A.shape
@@ -77,7 +237,7 @@ def minimum_norm(A, b):
     temp = P[indices,:]
     P1 = temp[0:n, 0:r]
     x = np.dot(P1 ,  np.dot( np.linalg.inv(R1)  , np.dot( Q1.T , b ) ) )
-    x = x.reshape(n, 1)
+    x = x.reshape(n, -1)
     return x
 def orthogonal_linear_system(A, b):
     coefficients = np.dot(A.T, b)
@@ -505,6 +665,7 @@ def elastic_net(A, b, verbose, lamda_val, alpha_val, opt):
     return x
 
 def rvm(A, b, max_iter):
+    b = np.asarray(b).reshape(-1)
     if max_iter is None:
         max_iter = 1000
     K, card = A.shape
@@ -65,7 +65,7 @@ def get_newton_determinant_maximization(Ao, number_of_subsamples):
         1. Joshi, S., Boyd, S., (2009) Sensor Selection via Convex Optimization. IEEE Transactions on Signal Processing, 57(2). `Paper <https://ieeexplore.ieee.org/document/4663892>`__
 
     """
-    A = deepcopy(Ao)
+    A = np.asarray(deepcopy(Ao))
     maxiter = 50
     n_tol = 1e-12
     gap = 1.005
@@ -74,7 +74,7 @@ def get_newton_determinant_maximization(Ao, number_of_subsamples):
     alpha = 0.01
     beta = 0.5
 
-    # Assuming the input matrix is an np.matrix()
+    # The diagonal matrices diag(z) are never formed; they are applied by scaling the rows of A.
     m, n = A.shape
     if m < n:
         raise ValueError( 'maxdet(): requires the number of columns to be greater than the number of rows!')
@@ -85,16 +85,13 @@ def get_newton_determinant_maximization(Ao, number_of_subsamples):
     kappa = np.log(gap) * n/m
 
     # Objective function
-    Z = _diag(z)
-    fz = -np.log(np.linalg.det(A.T * Z * A)) - kappa * np.sum(np.log(z) + np.log(1.0 - z))
+    fz = -np.log(np.linalg.det(np.dot(A.T, z * A))) - kappa * np.sum(np.log(z) + np.log(1.0 - z))
 
     # Optimization loop!
     for i in range(0, maxiter) :
-        Z = _diag(z)
-        W = np.linalg.inv(A.T * Z * A)
-        V = A * W * A.T
-        vo = np.matrix(np.diag(V))
-        vo = vo.T
+        W = np.linalg.inv(np.dot(A.T, z * A))
+        V = np.dot(np.dot(A, W), A.T)
+        vo = np.diag(V).reshape(m, 1)
 
         # define some z operations
         one_by_z = ones_m / z
@@ -105,7 +102,7 @@ def get_newton_determinant_maximization(Ao, number_of_subsamples):
         H = np.multiply(V, V) + kappa * _diag( one_by_z2 + one_by_one_minus_z2)
 
         # Textbook Newton's method -- compute inverse of Hessian
-        R = np.matrix(cholesky(H) )
+        R = cholesky(H)
         u = lstsq(R.T, g)
         Hinvg = lstsq(R, u[0])
         Hinvg = Hinvg[0]
@@ -124,16 +121,15 @@ def get_newton_determinant_maximization(Ao, number_of_subsamples):
 
         while flag == 1:
             zp = z + s*dz
-            Zp = _diag(zp)
-            fzp = -np.log(np.linalg.det(A.T * Zp * A) ) - kappa * np.sum(np.log(zp) + np.log(1 - zp)  )
-            const = fz + alpha * s * g.T * dz
+            fzp = -np.log(np.linalg.det(np.dot(A.T, zp * A)) ) - kappa * np.sum(np.log(zp) + np.log(1 - zp)  )
+            const = fz + alpha * s * np.dot(g.T, dz)
             if fzp <= const[0,0]:
                 flag = 2
             if flag != 2:
                 s = beta * s
         z = zp
         fz = fzp
-        sig = -g.T * dz * 0.5
+        sig = -np.dot(g.T, dz) * 0.5
         if( sig[0,0] <= n_tol):
             break
         zsort = np.sort(z, axis=0)
@@ -144,10 +140,9 @@ def get_newton_determinant_maximization(Ao, number_of_subsamples):
     thres = zsort[m - number_of_subsamples - 1]
     zhat, not_used = _find(z, thres)
     p, q = zhat.shape
-    Zhat = _diag(zhat)
-    L = np.log(np.linalg.det(A.T * Zhat  * A))
+    L = np.log(np.linalg.det(np.dot(A.T, zhat * A)))
     ztilde  = z
-    Utilde = np.log(np.linalg.det(A.T * _diag(z) * A))  + 2 * m * kappa
+    Utilde = np.log(np.linalg.det(np.dot(A.T, z * A)))  + 2 * m * kappa
     z = _binary2indices(zhat)
     return z
 def _binary2indices(zhat):
@@ -177,6 +172,5 @@ def _find(vec, thres):
             vec_new.append(1.0)
         else:
             vec_new.append(0.0)
-    vec_new = np.matrix(vec_new)
-    vec_new = vec_new.T
+    vec_new = np.array(vec_new).reshape(-1, 1)
     return vec_new, t
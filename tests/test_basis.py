@@ -34,5 +34,37 @@ class TestBasis(TestCase):
         N2 = total.get_cardinality()
         np.testing.assert_equal(N-10, N2)
 
+    def test_prefix_tree_evaluation(self):
+        np.random.seed(0)
+        parameters = [Parameter(distribution='uniform', lower=-1., upper=1., order=3) for _ in range(12)]
+        X = np.random.uniform(-1., 1., (40, 12))
+        poly = Poly(parameters, Basis('total-order'), method='least-squares', sampling_args={'sample-points': X, \
+                'sample-outputs': np.sum(X, axis=1).reshape(-1, 1)})
+        elements = poly.basis.elements[np.random.permutation(poly.basis.cardinality), :]
+        P = poly.get_poly(X, elements)
+        P_direct = np.ones(P.shape)
+        for k in range(0, 12):
+            p, _, _ = parameters[k]._get_orthogonal_polynomial(X[:,k], 3)
+            P_direct *= p[elements[:,k].astype(int)]
+        np.testing.assert_array_almost_equal(P, P_direct, decimal=12)
+    def test_single_precision_evaluation(self):
+        np.random.seed(1)
+        parameters = [Parameter(distribution='uniform', lower=-1., upper=1., order=5), \
+                Parameter(distribution='gaussian', shape_parameter_A=0., shape_parameter_B=1., order=5), \
+                Parameter(distribution='beta', lower=0., upper=1., shape_parameter_A=2., shape_parameter_B=3., order=5)]
+        X = np.random.rand(300, 3)
+        poly = Poly(parameters, Basis('total-order'), method='least-squares', sampling_args={'sample-points': X, \
+                'sample-outputs': np.exp(X[:,0:1]) * np.cos(X[:,1:2]) + X[:,2:3]**3})
+        poly.set_model()
+        X_test = np.random.rand(5000, 3)
+        P = poly.get_poly(X_test, dtype=np.float32)
+        self.assertEqual(P.dtype, np.float32)
+        np.testing.assert_allclose(P, poly.get_poly(X_test), rtol=1e-4, atol=1e-5)
+        y = poly.get_polyfit(X_test, dtype=np.float32)
+        self.assertEqual(y.dtype, np.float32)
+        np.testing.assert_allclose(y, poly.get_polyfit(X_test), rtol=1e-5)
+        with self.assertRaises(ValueError):
+            poly.get_polyfit(X_test, uq=True, dtype=np.float32)
+
 if __name__== '__main__':
     unittest.main()
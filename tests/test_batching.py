@@ -0,0 +1,43 @@
+from unittest import TestCase
+import unittest
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from equadratures import *
+import numpy as np
+
+def fun(x):
+    return np.exp(0.4*x[0]) * x[1]
+class TestBatching(TestCase):
+    def setUp(self):
+        np.random.seed(5)
+        param = Parameter(distribution='uniform', lower=-1., upper=1., order=4)
+        X = np.random.uniform(-1., 1., (100, 2))
+        self.poly = Poly([param, param], Basis('total-order'), method='least-squares', \
+                sampling_args={'sample-points': X, 'sample-outputs': evaluate_model(X, fun)})
+        self.poly.set_model()
+        self.X_test = np.random.uniform(-1., 1., (300, 2))
+    def test_batched_evaluation(self):
+        for executor in [None, ThreadPoolExecutor(max_workers=2)]:
+            batcher = PolyBatcher(self.poly, max_batch_size=64, max_latency=1e-2, executor=executor)
+            async def serve():
+                return await asyncio.gather(*[batcher.get_polyfit(x) for x in self.X_test])
+            values = asyncio.run(serve())
+            np.testing.assert_array_almost_equal(np.array(values), self.poly.get_polyfit(self.X_test).reshape(-1), decimal=12)
+            statistics = batcher.get_statistics()
+            self.assertEqual(statistics['requests'], 300)
+            self.assertEqual(statistics['batches'], 5)
+            self.assertGreater(statistics['throughput'], 0.0)
+            self.assertGreater(statistics['evaluation_time'], 0.0)
+            if executor is not None:
+                executor.shutdown()
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            PolyBatcher(self.poly, max_batch_size=0)
+        batcher = PolyBatcher(self.poly.freeze())
+        async def serve():
+            return await batcher.get_polyfit(np.zeros(3))
+        with self.assertRaises(ValueError):
+            asyncio.run(serve())
+
+if __name__== '__main__':
+    unittest.main()
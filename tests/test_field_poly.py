@@ -0,0 +1,34 @@
+from unittest import TestCase
+import unittest
+from equadratures import *
+import numpy as np
+
+s = np.linspace(0., 1., 500)
+def field(x):
+    return np.sin(np.pi * s * (1. + 0.3 * x[0])) * np.exp(0.5 * x[1] * s) + x[2] * s**2
+class TestFieldPoly(TestCase):
+    def setUp(self):
+        np.random.seed(7)
+        self.param = Parameter(distribution='uniform', lower=-1., upper=1., order=4)
+        self.X = np.random.uniform(-1., 1., (150, 3))
+        self.Y = evaluate_model(self.X, field)
+    def test_modal_fit(self):
+        for svd in ['randomised', 'incremental']:
+            poly = Poly([self.param] * 3, Basis('total-order'), method='least-squares', sampling_args={'sample-points': self.X})
+            field_poly = FieldPoly(poly, energy=1. - 1e-12, svd=svd, random_seed=1)
+            field_poly.set_model(self.Y)
+            self.assertLess(len(field_poly.get_singular_values()), 15)
+            # Compare with fitting every component of the field separately.
+            full_poly = Poly([self.param] * 3, Basis('total-order'), method='least-squares', sampling_args={'sample-points': self.X})
+            full_poly.set_model(self.Y)
+            X_test = np.random.uniform(-1., 1., (10, 3))
+            np.testing.assert_array_almost_equal(field_poly.get_polyfit(X_test), full_poly.get_polyfit(X_test), decimal=6)
+            chunks = np.hstack([values for _, values in field_poly.get_polyfit_chunks(X_test, chunk_size=64)])
+            np.testing.assert_array_almost_equal(chunks, field_poly.get_polyfit(X_test), decimal=12)
+            mean, variance = field_poly.get_mean_and_variance()
+            full_mean, full_variance = full_poly.get_mean_and_variance()
+            np.testing.assert_array_almost_equal(mean, full_mean, decimal=6)
+            np.testing.assert_array_almost_equal(variance, full_variance, decimal=6)
+
+if __name__== '__main__':
+    unittest.main()
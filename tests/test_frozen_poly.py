@@ -0,0 +1,65 @@
+from unittest import TestCase
+import unittest
+from equadratures import *
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+def fun(x):
+    return np.exp(0.4*x[0]) * x[1] + x[2]**3
+class TestFrozenPoly(TestCase):
+    def setUp(self):
+        np.random.seed(2)
+        parameters = [Parameter(distribution='uniform', lower=-1., upper=2., order=5), \
+                Parameter(distribution='gaussian', shape_parameter_A=0.5, shape_parameter_B=2., order=4), \
+                Parameter(distribution='beta', lower=0., upper=1., shape_parameter_A=2., shape_parameter_B=3., order=3)]
+        X = np.random.rand(300, 3)
+        self.poly = Poly(parameters, Basis('total-order'), method='least-squares', \
+                sampling_args={'sample-points': X, 'sample-outputs': evaluate_model(X, fun)})
+        self.poly.set_model()
+        self.X_test = np.random.rand(50, 3)
+    def test_evaluation(self):
+        frozen = self.poly.freeze(batch_size=16)
+        y = self.poly.get_polyfit(self.X_test)
+        np.testing.assert_array_almost_equal(frozen.get_polyfit(self.X_test), y, decimal=12)
+        y_point = np.array([frozen.get_polyfit_point(x) for x in self.X_test]).reshape(-1, 1)
+        np.testing.assert_array_almost_equal(y_point, y, decimal=12)
+    def test_pruning_and_immutability(self):
+        c = self.poly.get_coefficients().reshape(-1)
+        tolerance = np.median(np.abs(c))
+        frozen = self.poly.freeze(tolerance=tolerance)
+        self.assertEqual(len(frozen.get_coefficients()), np.sum(np.abs(c) > tolerance))
+        P = self.poly.get_poly(self.X_test)
+        active = np.abs(c) > tolerance
+        np.testing.assert_array_almost_equal(frozen.get_polyfit(self.X_test).reshape(-1), np.dot(c[active], P[active, :]), decimal=12)
+        with self.assertRaises(AttributeError):
+            frozen._coefficients = c
+        with self.assertRaises(ValueError):
+            frozen.get_coefficients()[0] = 1.0
+    def test_multiple_outputs(self):
+        parameters = self.poly.get_parameters()
+        X = np.random.rand(300, 3)
+        Y = np.hstack([evaluate_model(X, fun), np.sin(X[:,0:1]) + X[:,1:2]])
+        poly = Poly(parameters, Basis('total-order'), method='least-squares', sampling_args={'sample-points': X, 'sample-outputs': Y})
+        poly.set_model()
+        with self.assertRaises(ValueError):
+            poly.freeze()
+    def test_concurrent_evaluation(self):
+        frozen = self.poly.freeze(batch_size=7)
+        self.poly.set_vandermonde_cache_size(2**16)
+        points = [np.random.rand(np.random.randint(1, 30), 3) for _ in range(200)]
+        expected = [self.poly.get_polyfit(X) for X in points]
+        def evaluate(i):
+            return np.max(np.abs(frozen.get_polyfit(points[i]) - expected[i])) + \
+                    np.max(np.abs(self.poly._get_poly_cached(points[i]).T.dot(self.poly.get_coefficients()) - expected[i]))
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            errors = list(executor.map(evaluate, range(len(points))))
+        self.assertLess(max(errors), 1e-12)
+    def test_refit(self):
+        y = self.poly.get_polyfit(self.X_test)
+        X = self.poly.get_points()
+        refitted = self.poly.refit(2.0 * evaluate_model(X, fun))
+        np.testing.assert_array_almost_equal(self.poly.get_polyfit(self.X_test), y, decimal=12)
+        np.testing.assert_array_almost_equal(refitted.get_polyfit(self.X_test), 2.0 * y, decimal=10)
+
+if __name__== '__main__':
+    unittest.main()
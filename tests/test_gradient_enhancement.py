@@ -1,6 +1,7 @@
 from unittest import TestCase
 import unittest
 from equadratures import *
+from equadratures.poly import cell2matrix
 import numpy as np
 def fun(x):
     return np.exp(2*x[0] + x[1])
@@ -47,5 +48,21 @@ class TestC(TestCase):
             sampling_args={'mesh':'user-defined', 'sample-points': sample_points, 'sample-outputs': sample_outputs, 'sample-gradients': sample_grads})
         OBJECT2.set_model(fun, gradfun)
         coefficients = OBJECT.get_coefficients()
+    def test_stacked_system(self):
+        np.random.seed(3)
+        x = Parameter(distribution='Uniform', order=3, lower=-1., upper=1.)
+        parameters = [x, x, x, x]
+        X = np.random.rand(40, 4) * 2.0 - 1.0
+        y = np.exp(np.dot(X, [0.5, 0.2, 0.3, 0.1])).reshape(-1, 1)
+        dy = y * np.array([0.5, 0.2, 0.3, 0.1])
+        poly = Poly(parameters=parameters, basis=Basis('total-order'), method='least-squares-with-gradients', \
+                sampling_args={'mesh':'user-defined', 'sample-points': X, 'sample-outputs': y, 'sample-gradients': dy})
+        poly.set_model(y, dy)
+        w = np.sqrt(poly.get_weights())
+        A = (w * poly.get_poly(X)).T
+        C = np.vstack([(w * dP).T for dP in poly.get_poly_grad(X)])
+        np.testing.assert_array_almost_equal(cell2matrix(poly.get_poly_grad(X), w), C, decimal=12)
+        reference = np.linalg.lstsq(np.vstack([A, C]), np.vstack([w.reshape(-1, 1) * y, (w.reshape(-1, 1) * dy).T.reshape(-1, 1)]), rcond=None)[0]
+        np.testing.assert_array_almost_equal(poly.get_coefficients(), reference, decimal=10)
 if __name__== '__main__':
     unittest.main()
\ No newline at end of file
@@ -72,5 +72,15 @@ class TestC(TestCase):
         G3 = np.dot(A3.T, A3)
         cond_number = np.linalg.cond(G3)
         np.testing.assert_array_less(cond_number, 200.0)
+    def test_least_squares_sketch(self):
+        params = [Parameter(lower=-1, upper=1, order=4, distribution='uniform') for i in range(3)]
+        myPoly = Poly(params, Basis('total-order'), method='least-squares', sampling_args={'mesh':'monte-carlo'})
+        model_evals = evaluate_model(myPoly.get_points(), lambda x: np.exp(0.5 * np.sum(x)))
+        myPoly.set_model(model_evals)
+        for sketch in ['count-sketch', 'srht']:
+            mySketchedPoly = Poly(params, Basis('total-order'), method='least-squares', \
+                    sampling_args={'sample-points': myPoly.get_points()}, solver_args={'sketch': sketch, 'random-seed': 1})
+            mySketchedPoly.set_model(model_evals)
+            np.testing.assert_array_almost_equal(mySketchedPoly.get_coefficients(), myPoly.get_coefficients(), decimal=10)
 if __name__== '__main__':
     unittest.main()
\ No newline at end of file
@@ -34,6 +34,20 @@ class TestA(TestCase):
         mean, variance = poly.get_mean_and_variance()
         np.testing.assert_almost_equal(mean, 1294.276442022, decimal=3,err_msg='Problem!')
         np.testing.assert_almost_equal(variance, 20320178.96583, decimal=3, err_msg='Problem!')
+    def test_sparse_grid_tensor_rows(self):
+        param = Parameter(distribution='uniform', lower=-1., upper=1., order=4)
+        basis = Basis('sparse-grid', level=3, growth_rule='linear')
+        poly = Poly(parameters=[param, param, param], basis=basis, method='numerical-integration')
+        pts = poly.get_points()
+        for tensor, indices in zip(poly.quadrature.list, poly.quadrature.sparse_point_indices):
+            np.testing.assert_array_equal(pts[indices], tensor.points)
+        model_evals = evaluate_model(pts, model2)
+        poly.set_model(model_evals)
+        threaded_poly = Poly(parameters=[param, param, param], basis=basis, method='numerical-integration', solver_args={'threads': 4})
+        threaded_poly.set_model(model_evals)
+        np.testing.assert_array_equal(threaded_poly.get_multi_index(), poly.get_multi_index())
+        np.testing.assert_array_almost_equal(threaded_poly.get_coefficients(), poly.get_coefficients(), decimal=14)
+        np.testing.assert_almost_equal(poly.get_mean_and_variance()[0], (np.exp(1.) - np.exp(-1.))**2 / 4., decimal=6)
     def test_univariate_quadrature_rules(self):
         param = Parameter(distribution='uniform', lower=-1., upper=1., order=20, endpoints='both')
         basis = Basis('univariate')
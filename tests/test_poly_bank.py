@@ -0,0 +1,44 @@
+from unittest import TestCase
+import unittest
+from equadratures import *
+import numpy as np
+
+def fun(x):
+    return np.exp(0.4*x[0]) * x[1] + np.sin(x[0])
+class TestPolyBank(TestCase):
+    def setUp(self):
+        np.random.seed(4)
+        self.polys = []
+        for lower, mean, variance in [(-1., 0., 1.), (0., 1., 0.5), (2., -1., 2.), (-3., 0.5, 1.5)]:
+            parameters = [Parameter(distribution='uniform', lower=lower, upper=lower + 2., order=4), \
+                    Parameter(distribution='gaussian', shape_parameter_A=mean, shape_parameter_B=variance, order=4)]
+            X = np.vstack([np.random.uniform(lower, lower + 2., 80), np.random.normal(mean, np.sqrt(variance), 80)]).T
+            poly = Poly(parameters, Basis('total-order'), method='least-squares', \
+                    sampling_args={'sample-points': X, 'sample-outputs': evaluate_model(X, fun)})
+            poly.set_model()
+            self.polys.append(poly)
+        self.X_test = np.vstack([np.random.uniform(-3., 4., 500), np.random.normal(0., 1., 500)]).T
+    def test_evaluation(self):
+        bank = PolyBank(self.polys)
+        self.assertEqual(len(bank), 4)
+        expected = np.hstack([poly.get_polyfit(self.X_test) for poly in self.polys])
+        np.testing.assert_allclose(bank.get_polyfit(self.X_test), expected, rtol=1e-10, atol=1e-10)
+        assignments = np.random.randint(0, 4, self.X_test.shape[0])
+        np.testing.assert_allclose(bank.get_polyfit(self.X_test, assignments).reshape(-1), \
+                expected[np.arange(self.X_test.shape[0]), assignments], rtol=1e-10, atol=1e-10)
+        shared = PolyBank([self.polys[1], self.polys[1]])
+        np.testing.assert_allclose(shared.get_polyfit(self.X_test), expected[:, [1, 1]], rtol=1e-12, atol=1e-12)
+    def test_incompatible_polys(self):
+        parameters = [Parameter(distribution='beta', lower=0., upper=1., shape_parameter_A=2., shape_parameter_B=3., order=4), \
+                self.polys[0].parameters[1]]
+        X = np.random.rand(80, 2)
+        poly = Poly(parameters, Basis('total-order'), method='least-squares', \
+                sampling_args={'sample-points': X, 'sample-outputs': evaluate_model(X, fun)})
+        poly.set_model()
+        with self.assertRaises(ValueError):
+            PolyBank([self.polys[0], poly])
+        with self.assertRaises(ValueError):
+            PolyBank(self.polys).get_polyfit(self.X_test, np.zeros(3))
+
+if __name__== '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+from unittest import TestCase
+import unittest
+from equadratures import *
+import numpy as np
+
+def fun(x):
+    return np.exp(0.3*x[0] + 0.5*x[1]) * np.sin(x[2]) + x[0] * x[3]**3
+class TestDerivatives(TestCase):
+    def setUp(self):
+        np.random.seed(1)
+        d = 4
+        parameters = [Parameter(distribution='uniform', lower=-1., upper=1., order=4) for _ in range(d)]
+        parameters[1] = Parameter(distribution='gaussian', shape_parameter_A=0.3, shape_parameter_B=2., order=4)
+        X = np.random.uniform(-1., 1., (200, d))
+        self.poly = Poly(parameters, Basis('total-order'), method='least-squares', \
+                sampling_args={'sample-points': X, 'sample-outputs': evaluate_model(X, fun)})
+        self.poly.set_model()
+        self.X_test = np.random.uniform(-1., 1., (20, d))
+        self.d = d
+    def test_gradient_and_hessian(self):
+        H = self.poly.get_poly_grad(self.X_test)
+        c = self.poly.get_coefficients().reshape(-1)
+        grad_basis = np.array([np.dot(c, H[i]) for i in range(self.d)])
+        np.testing.assert_array_almost_equal(self.poly.get_polyfit_grad(self.X_test), grad_basis, decimal=10)
+        Hess = self.poly.get_poly_hess(self.X_test)
+        hess_basis = np.array([[np.dot(c, Hess[i * self.d + j]) for j in range(self.d)] for i in range(self.d)])
+        np.testing.assert_array_almost_equal(self.poly.get_polyfit_hess(self.X_test), hess_basis, decimal=10)
+    def test_jacobian_and_hessian_vector_products(self):
+        v = np.random.randn(self.d)
+        f, g, jvp, hvp = self.poly.get_polyfit_derivatives(self.X_test, direction=v, hessian_vector_product=True)
+        np.testing.assert_array_almost_equal(f, self.poly.get_polyfit(self.X_test), decimal=10)
+        np.testing.assert_array_almost_equal(g, self.poly.get_polyfit_grad(self.X_test), decimal=10)
+        np.testing.assert_array_almost_equal(jvp.reshape(-1), np.dot(v, g), decimal=10)
+        hess = self.poly.get_polyfit_hess(self.X_test)
+        np.testing.assert_array_almost_equal(hvp, np.einsum('ijn,j->in', hess, v), decimal=10)
+        V = np.random.randn(self.X_test.shape[0], self.d)
+        _, _, jvp = self.poly.get_polyfit_derivatives(self.X_test, direction=V)
+        np.testing.assert_array_almost_equal(jvp.reshape(-1), np.sum(V.T * g, axis=0), decimal=10)
+    def test_differentiation_matrices(self):
+        _, grads = self.poly._get_contracted_derivatives(self.X_test)
+        np.testing.assert_array_almost_equal(self.poly.get_polyfit_grad(self.X_test), grads, decimal=10)
+        for k in range(self.d):
+            derivative_poly = self.poly.get_derivative_poly(k)
+            self.assertIs(derivative_poly, self.poly.get_derivative_poly(k))
+            np.testing.assert_array_almost_equal(derivative_poly.get_polyfit(self.X_test).reshape(-1), grads[k], decimal=10)
+            # The derivative is built from the coefficients alone, without the training data of this polynomial.
+            for name in ['A', 'P', '_model_evaluations', '_quadrature_points', 'inputs', 'outputs']:
+                self.assertIsNone(derivative_poly.__dict__.get(name))
+        partial = self.poly.get_polyfit_grad(self.X_test, dim_index=[1])
+        np.testing.assert_array_almost_equal(partial[1], grads[1], decimal=10)
+        np.testing.assert_array_equal(partial[0], 0.0)
+
+if __name__== '__main__':
+    unittest.main()
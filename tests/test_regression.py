@@ -5,6 +5,11 @@ from equadratures import datasets
 
 import numpy as np
 import scipy.stats as st
+import os
+import tempfile
+import pickle
+import multiprocessing
+from unittest import mock
 
 class TestC(TestCase):
 
@@ -202,6 +207,215 @@ class TestC(TestCase):
         y_pred, y_std = poly.get_polyfit(X_test,uq=True)
 
         np.testing.assert_array_almost_equal(y_std.mean(), 0.682095574, decimal=5, err_msg='Problem!')
+    def test_vandermonde_cache(self):
+        """
+        Tests that the basis evaluated at the training points is re-used when fitting and scoring.
+        """
+        X,y = datasets.gen_linear(n_observations=200,n_dim=3,bias=0.5,n_relevent=1,noise=0.05,random_seed=1)
+        param = Parameter(distribution='Uniform', lower=-1, upper=1, order=3)
+        poly = Poly([param for i in range(3)], Basis('total-order'), method='least-squares', sampling_args={'sample-points':X, 'sample-outputs':y.reshape(-1,1)} )
+        P = poly.get_poly(X)
+        poly.clear_vandermonde_cache()
+        with mock.patch.object(Poly, '_get_poly', autospec=True, side_effect=Poly._get_poly) as get_poly:
+            np.testing.assert_array_almost_equal(poly._get_poly_cached(X), P, decimal=12)
+            self.assertEqual(get_poly.call_count, 1)
+            get_poly.reset_mock()
+            poly.set_model()
+            train_score = poly.get_polyscore()
+            np.testing.assert_array_almost_equal(poly._get_poly_cached(X), P, decimal=12)
+            self.assertEqual(get_poly.call_count, 0)
+        poly.set_vandermonde_cache_size(0)
+        self.assertEqual(len(poly._vandermonde_cache), 0)
+    def test_factorisation_reuse(self):
+        """
+        Tests that repeated fits on the same points re-use the factorisation of the design matrix.
+        """
+        np.random.seed(3)
+        X = np.random.uniform(-1, 1, (80, 3))
+        param = Parameter(distribution='Uniform', lower=-1, upper=1, order=3)
+        poly = Poly([param for i in range(3)], Basis('total-order'), method='least-squares', sampling_args={'sample-points':X, 'sample-outputs':X[:,0:1]**2})
+        poly.set_model()
+        factorisation = poly._design_factorisation
+        y = np.exp(X[:,1:2]) * X[:,2:3]
+        poly.set_model(y)
+        self.assertIs(poly._design_factorisation, factorisation)
+        w = np.sqrt(poly.get_weights()).reshape(-1, 1)
+        coefficients = np.linalg.lstsq(w * poly.get_poly(X).T, w * y, rcond=None)[0]
+        np.testing.assert_array_almost_equal(poly.get_coefficients(), coefficients, decimal=12)
+    def test_add_samples(self):
+        """
+        Tests that appending samples to a fit matches a fit on all the samples.
+        """
+        np.random.seed(4)
+        X = np.random.uniform(-1, 1, (150, 3))
+        y = np.exp(0.5 * X[:,0:1]) * X[:,1:2] + X[:,2:3]**2
+        param = Parameter(distribution='Uniform', lower=-1, upper=1, order=4)
+        poly = Poly([param for i in range(3)], Basis('total-order'), method='least-squares', sampling_args={'sample-points':X[0:100], 'sample-outputs':y[0:100]})
+        poly.set_model()
+        poly.add_samples(X[100:130], y[100:130])
+        poly.add_samples(X[130:150], y[130:150])
+        # The training data and design matrices are only stacked when next needed.
+        self.assertNotIn('A', poly.__dict__)
+        self.assertNotIn('_quadrature_points', poly.__dict__)
+        full_poly = Poly([param for i in range(3)], Basis('total-order'), method='least-squares', sampling_args={'sample-points':X, 'sample-outputs':y})
+        full_poly.set_model()
+        np.testing.assert_array_almost_equal(poly.get_coefficients(), full_poly.get_coefficients(), decimal=10)
+        np.testing.assert_array_almost_equal(poly.get_weights(), full_poly.get_weights(), decimal=12)
+        np.testing.assert_array_almost_equal(poly.get_mean_and_variance(), full_poly.get_mean_and_variance(), decimal=10)
+        np.testing.assert_array_almost_equal(poly.P, full_poly.P, decimal=12)
+        np.testing.assert_array_almost_equal(poly.A, full_poly.A, decimal=12)
+    def test_streaming_least_squares(self):
+        """
+        Tests that least squares on streamed chunks matches least squares on all the data.
+        """
+        np.random.seed(5)
+        X = np.random.uniform(-1, 1, (500, 3))
+        y = np.sin(X[:,0:1] + X[:,1:2]) * X[:,2:3]
+        param = Parameter(distribution='Uniform', lower=-1, upper=1, order=4)
+        poly = Poly([param for i in range(3)], Basis('total-order'), method='least-squares', sampling_args={'sample-points':X, 'sample-outputs':y})
+        poly.set_model()
+        coefficients = poly.get_coefficients()
+        poly.set_model_streaming((X, y), chunk_size=64)
+        np.testing.assert_array_almost_equal(poly.get_coefficients(), coefficients, decimal=10)
+        poly.set_model_streaming(((X[i:i+100], y[i:i+100]) for i in range(0, 500, 100)), processes=2)
+        np.testing.assert_array_almost_equal(poly.get_coefficients(), coefficients, decimal=10)
+        # The spawn start method, the default on macOS and Windows, pickles the Poly to each process.
+        poly = pickle.loads(pickle.dumps(poly))
+        poly.set_model_streaming((X, y), chunk_size=100, processes=2, mp_context=multiprocessing.get_context('spawn'))
+        np.testing.assert_array_almost_equal(poly.get_coefficients(), coefficients, decimal=10)
+    def test_cross_validation(self):
+        """
+        Tests that the closed-form leave-one-out score matches k-fold cross-validation with one sample per fold.
+        """
+        np.random.seed(6)
+        X = np.random.uniform(-1, 1, (60, 2))
+        y = np.exp(X[:,0:1]) * X[:,1:2] + 0.01 * np.random.randn(60, 1)
+        param = Parameter(distribution='Uniform', lower=-1, upper=1, order=4)
+        poly = Poly([param, param], Basis('total-order'), method='least-squares', sampling_args={'sample-points':X, 'sample-outputs':y})
+        poly.set_model()
+        loo_score = poly.get_loo_score()
+        np.testing.assert_almost_equal(loo_score, poly.get_kfold_score(k=60, threads=2), decimal=10)
+        self.assertLess(poly.get_polyscore(metric='rmse'), loo_score)
+    def test_multiple_outputs(self):
+        """
+        Tests that fitting several outputs at once matches fitting each output separately.
+        """
+        np.random.seed(2)
+        X = np.random.uniform(-1, 1, (100, 2))
+        Y = np.hstack([np.exp(X[:,0:1]) * X[:,1:2], np.sin(X[:,0:1]) + X[:,1:2]**2])
+        param = Parameter(distribution='Uniform', lower=-1, upper=1, order=4)
+        poly = Poly([param, param], Basis('total-order'), method='least-squares', sampling_args={'sample-points':X, 'sample-outputs':Y})
+        poly.set_model()
+        self.assertEqual(poly.get_coefficients().shape, (15, 2))
+        X_test = np.random.uniform(-1, 1, (20, 2))
+        y_fit = poly.get_polyfit(X_test)
+        mean, variance = poly.get_mean_and_variance()
+        sobol = poly.get_sobol_indices(1)
+        for j in range(0, 2):
+            poly_j = Poly([param, param], Basis('total-order'), method='least-squares', sampling_args={'sample-points':X, 'sample-outputs':Y[:,j:j+1]})
+            poly_j.set_model()
+            np.testing.assert_array_almost_equal(y_fit[:,j:j+1], poly_j.get_polyfit(X_test), decimal=10)
+            np.testing.assert_array_almost_equal([mean[j], variance[j]], poly_j.get_mean_and_variance(), decimal=10)
+            np.testing.assert_almost_equal(sobol[j][(0,)], poly_j.get_sobol_indices(1)[(0,)], decimal=10)
+    def test_multiple_outputs_nonlinear_solvers(self):
+        """
+        Tests that solvers that are not linear in the outputs fit one output at a time, and accept outputs given as a vector.
+        """
+        np.random.seed(2)
+        X = np.random.uniform(-1, 1, (100, 2))
+        Y = np.hstack([np.exp(X[:,0:1]) * X[:,1:2], np.sin(X[:,0:1]) + X[:,1:2]**2])
+        param = Parameter(distribution='Uniform', lower=-1, upper=1, order=4)
+        for method in ['relevance-vector-machine', 'least-absolute-residual']:
+            poly = Poly([param, param], Basis('total-order'), method=method, sampling_args={'sample-points':X, 'sample-outputs':Y})
+            poly.set_model()
+            self.assertEqual(poly.get_coefficients().shape, (15, 2))
+            for j in range(0, 2):
+                poly_j = Poly([param, param], Basis('total-order'), method=method, sampling_args={'sample-points':X, 'sample-outputs':Y[:,j]})
+                poly_j.set_model()
+                np.testing.assert_array_almost_equal(poly.get_coefficients()[:,j], np.reshape(poly_j.get_coefficients(), -1), decimal=8)
+            # The folds of a k-fold score are solved one output at a time too; the squared rmse averages over the outputs.
+            kfold_scores = []
+            for j in range(0, 2):
+                poly_j = Poly([param, param], Basis('total-order'), method=method, sampling_args={'sample-points':X, 'sample-outputs':Y[:,j]})
+                poly_j.set_model()
+                kfold_scores.append(poly_j.get_kfold_score(k=5, random_seed=0))
+            np.testing.assert_almost_equal(poly.get_kfold_score(k=5, random_seed=0)**2, np.mean(np.square(kfold_scores)), decimal=8)
+    def test_order_selection(self):
+        """
+        Tests that the nested order search scores the largest order exactly as a direct fit, and selects the expected order.
+        """
+        np.random.seed(7)
+        X = np.random.uniform(-1, 1, (150, 3))
+        y = np.exp(0.5 * X[:,0:1]) * X[:,1:2]**2 + X[:,2:3] + 0.01 * np.random.randn(150, 1)
+        param = Parameter(distribution='Uniform', lower=-1, upper=1, order=6)
+        poly = Poly([param, param, param], Basis('total-order'), method='least-squares', sampling_args={'sample-points':X, 'sample-outputs':y})
+        poly.set_model()
+        best, scores = poly.select_order()
+        self.assertEqual(len(scores), 6)
+        np.testing.assert_almost_equal(scores[-1], poly.get_loo_score(), decimal=10)
+        self.assertEqual(best.highest_order, np.argmin(scores) + 1)
+        self.assertLess(best.get_loo_score(), poly.get_loo_score())
+        _, bic = poly.select_order(orders=[2, 3, 4], criterion='bic')
+        self.assertEqual(len(bic), 3)
+    def test_save_and_load(self):
+        """
+        Tests that a saved polynomial loads with memory-mapped arrays and reproduces the fit, its gradients and its statistics.
+        """
+        np.random.seed(8)
+        X = np.random.uniform(-1, 1, (80, 2))
+        y = np.exp(X[:,0:1]) * X[:,1:2]
+        parameters = [Parameter(distribution='Uniform', lower=-1, upper=1, order=4), \
+                Parameter(distribution='Gaussian', shape_parameter_A=0., shape_parameter_B=1., order=4)]
+        poly = Poly(parameters, Basis('total-order'), method='least-squares', sampling_args={'sample-points':X, 'sample-outputs':y})
+        poly.set_model()
+        filename = os.path.join(tempfile.mkdtemp(), 'poly')
+        poly.save(filename)
+        loaded = Poly.load(filename + '.npz')
+        self.assertIsInstance(loaded.get_coefficients(), np.memmap)
+        self.assertTrue(np.issubdtype(loaded.get_multi_index().dtype, np.integer))
+        X_test = np.random.uniform(-1, 1, (20, 2))
+        np.testing.assert_array_almost_equal(loaded.get_polyfit(X_test), poly.get_polyfit(X_test), decimal=12)
+        np.testing.assert_array_almost_equal(loaded.get_polyfit_grad(X_test), poly.get_polyfit_grad(X_test), decimal=12)
+        np.testing.assert_array_almost_equal(loaded.get_mean_and_variance(), poly.get_mean_and_variance(), decimal=12)
+        # In more than six dimensions the statistics are computed from the sample points, which are then saved with the polynomial.
+        X = np.random.uniform(-1, 1, (60, 7))
+        poly = Poly([parameters[0] for i in range(7)], Basis('total-order', orders=[2 for i in range(7)]), method='least-squares', \
+                sampling_args={'sample-points':X, 'sample-outputs':np.sum(X**2, axis=1).reshape(-1, 1)})
+        poly.set_model()
+        poly.save(filename)
+        loaded = Poly.load(filename + '.npz')
+        np.testing.assert_array_almost_equal(loaded.get_mean_and_variance(), poly.get_mean_and_variance(), decimal=12)
+    def test_release_training_data(self):
+        """
+        Tests that a polynomial whose training data are released still evaluates and computes statistics, and recomputes its design
+        matrices on demand.
+        """
+        np.random.seed(9)
+        X = np.random.uniform(-1, 1, (100, 3))
+        y = np.exp(X[:,0:1]) * X[:,1:2] + X[:,2:3]**2
+        parameter = Parameter(distribution='Uniform', lower=-1, upper=1, order=3)
+        poly = Poly([parameter, parameter, parameter], Basis('total-order'), method='least-squares', \
+                sampling_args={'sample-points':X, 'sample-outputs':y})
+        poly.set_model()
+        X_test = np.random.uniform(-1, 1, (20, 3))
+        y_test, y_std = poly.get_polyfit(X_test, uq=True)
+        mean_and_variance = poly.get_mean_and_variance()
+        A = poly.A.copy()
+        poly.release_training_data(keep_uncertainty=True)
+        self.assertNotIn('A', poly.__dict__)
+        self.assertIsNone(poly.outputs)
+        np.testing.assert_array_almost_equal(poly.get_polyfit(X_test, uq=True)[1], y_std, decimal=12)
+        np.testing.assert_array_almost_equal(poly.get_mean_and_variance(), mean_and_variance, decimal=12)
+        np.testing.assert_array_almost_equal(poly.A, A, decimal=12)
+        with self.assertRaises(AttributeError):
+            poly.get_model_evaluations()
+        # Quadrature points of a tensor grid are dropped and regenerated.
+        tensor_poly = Poly([parameter, parameter, parameter], Basis('tensor-grid'), method='numerical-integration')
+        tensor_poly.set_model(lambda x: np.exp(x[0]) * x[1] + x[2]**2)
+        points = tensor_poly.get_points()
+        tensor_poly.release_training_data()
+        self.assertNotIn('_quadrature_points', tensor_poly.__dict__)
+        np.testing.assert_array_equal(tensor_poly.get_points(), points)
 
 if __name__== '__main__':
     unittest.main()
@@ -1,6 +1,7 @@
 from unittest import TestCase
 import unittest
 from equadratures import *
+from equadratures.quadrature import Quadrature
 import numpy as np
 from scipy.stats import skew, kurtosis
 
@@ -109,5 +110,65 @@ class TestD(TestCase):
         all_indices = pistonmodel.get_total_sobol_indices()
         np.testing.assert_array_less(all_indices[0], all_indices[1])
         pistonmodel.get_summary('piston_model.txt')
+    def test_pruned_statistics(self):
+        np.random.seed(3)
+        parameters = [Parameter(distribution='uniform', lower=-1., upper=1., order=4) for _ in range(4)]
+        X = np.random.uniform(-1., 1., (200, 4))
+        y = evaluate_model(X, fun)
+        poly = Poly(parameters, Basis('total-order'), method='least-squares', \
+                sampling_args={'sample-points': X, 'sample-outputs': y})
+        poly.set_model()
+        sparse_poly = Poly(parameters, Basis('total-order'), method='least-squares', \
+                sampling_args={'sample-points': X, 'sample-outputs': y}, solver_args={'pruning-tolerance': 1e-8})
+        sparse_poly.set_model()
+        self.assertEqual(sparse_poly.get_active_multi_index().shape[0], 5)
+        X_test = np.random.uniform(-1., 1., (30, 4))
+        np.testing.assert_array_almost_equal(sparse_poly.get_polyfit(X_test), poly.get_polyfit(X_test), decimal=10)
+        np.testing.assert_array_almost_equal(sparse_poly.get_polyfit_grad(X_test), poly.get_polyfit_grad(X_test), decimal=10)
+        np.testing.assert_array_almost_equal(sparse_poly.get_mean_and_variance(), poly.get_mean_and_variance(), decimal=10)
+        np.testing.assert_array_almost_equal(sparse_poly.get_skewness_and_kurtosis(), poly.get_skewness_and_kurtosis(), decimal=8)
+        np.testing.assert_almost_equal(sparse_poly.get_sobol_indices(1)[(0,)], poly.get_sobol_indices(1)[(0,)], decimal=10)
+    def test_polynomial_products(self):
+        np.random.seed(4)
+        parameters = [Parameter(distribution='uniform', lower=-1., upper=2., order=3), \
+                Parameter(distribution='gaussian', shape_parameter_A=0.3, shape_parameter_B=2., order=3)]
+        X = np.random.uniform(-1., 1., (100, 2))
+        poly = Poly(parameters, Basis('total-order'), method='least-squares', \
+                sampling_args={'sample-points': X, 'sample-outputs': evaluate_model(X, lambda x: np.exp(0.4 * x[0]) * x[1])})
+        poly.set_model()
+        other = Poly(parameters, Basis('total-order'), method='least-squares', \
+                sampling_args={'sample-points': X, 'sample-outputs': evaluate_model(X, lambda x: np.sin(x[0]) + x[1]**2)})
+        other.set_model()
+        X_test = np.random.uniform(-1., 1., (30, 2))
+        np.testing.assert_array_almost_equal((poly * other).get_polyfit(X_test), poly.get_polyfit(X_test) * other.get_polyfit(X_test), decimal=10)
+        np.testing.assert_array_almost_equal((poly**3).get_polyfit(X_test), poly.get_polyfit(X_test)**3, decimal=10)
+        np.testing.assert_array_almost_equal((2. * poly).get_polyfit(X_test), 2. * poly.get_polyfit(X_test), decimal=12)
+        self.assertNotIn('_model_evaluations', (poly * other).__dict__)
+        # Reference moments from a Gauss rule that integrates the fourth power exactly.
+        quadrature = Quadrature(parameters=parameters, basis=Basis('tensor-grid', orders=[7, 7]), mesh='tensor-grid', points=None)
+        points, weights = quadrature.get_points_and_weights()
+        g = poly.get_polyfit(points).reshape(-1)
+        g = g - np.dot(weights, g)
+        variance = np.dot(weights, g**2)
+        skewness, kurtosis = poly.get_skewness_and_kurtosis(exact=True)
+        np.testing.assert_almost_equal(skewness, np.dot(weights, g**3) / variance**1.5, decimal=10)
+        np.testing.assert_almost_equal(kurtosis, np.dot(weights, g**4) / variance**2, decimal=10)
+    def test_exact_moments_with_zero_coefficients(self):
+        param = Parameter(distribution='uniform', lower=-1., upper=1., order=2)
+        X = np.random.uniform(-1., 1., (40, 2))
+        poly = Poly([param, param], Basis('total-order'), method='least-squares', \
+                sampling_args={'sample-points': X, 'sample-outputs': evaluate_model(X, lambda x: x[0] + 0.3 * x[0]**2)})
+        poly.set_model()
+        coefficients = poly.get_coefficients()
+        coefficients[np.abs(coefficients) < 1e-12] = 0.0
+        poly.coefficients = coefficients
+        skewness, kurtosis = poly.get_skewness_and_kurtosis(exact=True)
+        quadrature = Quadrature(parameters=[param, param], basis=Basis('tensor-grid', orders=[5, 5]), mesh='tensor-grid', points=None)
+        points, weights = quadrature.get_points_and_weights()
+        g = poly.get_polyfit(points).reshape(-1)
+        g = g - np.dot(weights, g)
+        variance = np.dot(weights, g**2)
+        np.testing.assert_almost_equal(skewness, np.dot(weights, g**3) / variance**1.5, decimal=10)
+        np.testing.assert_almost_equal(kurtosis, np.dot(weights, g**4) / variance**2, decimal=10)
 if __name__== '__main__':
     unittest.main()
\ No newline at end of file